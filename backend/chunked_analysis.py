@@ -0,0 +1,129 @@
+"""Map-reduce helpers for analyzing a contract in overlapping windows.
+
+``window_bounds`` cuts the full text into prompt-sized windows that
+overlap, so a clause straddling a boundary is seen whole at least once.
+When a window limit is given, the windows are widened to stay within it
+rather than leaving the end of the text out.
+``merge_analyses`` folds the per-window results back into the single
+AnalysisResult shape, de-duplicating parties, key terms and risks.
+"""
+import re
+
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3}
+
+# ============ SPLITTING ============
+def _bounds(text: str, size: int, overlap: int) -> list:
+    overlap = min(max(overlap, 0), size // 2)
+    bounds = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer ending on a line break, then on any whitespace
+            cut = max(text.rfind("\n", start + size // 2, end), text.rfind(" ", start + size // 2, end))
+            if cut > start:
+                end = cut
+        bounds.append((start, end))
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return bounds
+
+def window_bounds(text: str, size: int, overlap: int, max_windows: int = None, max_size: int = None) -> list:
+    """(start, end) of overlapping windows of ``size`` characters, cut at whitespace.
+
+    If more than ``max_windows`` windows would be needed, the windows are
+    widened, up to ``max_size`` characters, until that many cover the text.
+    Only when even the widest windows do not suffice are the last ones
+    dropped; the end of the last window then falls short of ``len(text)``.
+    """
+    if size <= 0:
+        raise ValueError("window size must be positive")
+    bounds = _bounds(text, size, overlap)
+    while max_windows and len(bounds) > max_windows and (max_size is None or size < max_size):
+        size = size * len(bounds) // max_windows + 1
+        if max_size is not None:
+            size = min(size, max_size)
+        bounds = _bounds(text, size, overlap)
+    return bounds[:max_windows] if max_windows else bounds
+
+# ============ MERGING ============
+def is_specified(value) -> bool:
+    """False for the placeholders the prompt and fallback use for missing data"""
+    if not value or not isinstance(value, str):
+        return False
+    lowered = value.lower()
+    return not (
+        lowered.startswith("not specified")
+        or "not clearly specified" in lowered
+        or "[name]" in lowered
+        or lowered in ("n/a", "none", "unknown", "yyyy-mm-dd")
+    )
+
+def _normalize(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", value.lower()).strip()
+
+def _is_iso_date(value: str) -> bool:
+    return bool(re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()))
+
+def calculate_risk_score(risks: list) -> float:
+    """3 points per high, 2 per medium, 1 per low risk, capped at 10"""
+    risk_score = sum(SEVERITY_RANK.get(str(r.get("severity", "")).lower(), 1) for r in risks)
+    return min(risk_score, 10)
+
+def note_partial_analysis(analysis: dict, note: str) -> dict:
+    """Record as a risk that part of the contract was not analyzed"""
+    risks = list(analysis.get("risks") or []) + [{"description": note, "severity": "medium"}]
+    return dict(analysis, risks=risks, risk_score=calculate_risk_score(risks))
+
+def merge_analyses(results: list, max_terms: int = 10, max_risks: int = 10) -> dict:
+    """Combine per-window analyses, in document order, into one result"""
+    results = [r for r in results if r]
+
+    parties = next((r["parties"] for r in results if is_specified(r.get("parties"))), None)
+
+    values = [r["contract_value"] for r in results if is_specified(r.get("contract_value"))]
+    # The headline amount is usually repeated; fall back to the first mention
+    contract_value = max(values, key=lambda v: (values.count(v), -values.index(v))) if values else None
+
+    starts = [r["start_date"] for r in results if is_specified(r.get("start_date"))]
+    ends = [r["end_date"] for r in results if is_specified(r.get("end_date"))]
+    iso_starts = [d for d in starts if _is_iso_date(d)]
+    iso_ends = [d for d in ends if _is_iso_date(d)]
+    start_date = min(iso_starts) if iso_starts else (starts[0] if starts else None)
+    end_date = max(iso_ends) if iso_ends else (ends[0] if ends else None)
+
+    key_terms = []
+    seen_terms = set()
+    for r in results:
+        for term in r.get("key_terms") or []:
+            key = _normalize(str(term))
+            if key and key not in seen_terms:
+                seen_terms.add(key)
+                key_terms.append(term)
+
+    risks_by_key = {}
+    for r in results:
+        for risk in r.get("risks") or []:
+            description = str(risk.get("description", "")).strip()
+            key = _normalize(description)
+            if not key:
+                continue
+            severity = str(risk.get("severity", "low")).lower()
+            if severity not in SEVERITY_RANK:
+                severity = "low"
+            current = risks_by_key.get(key)
+            if current is None or SEVERITY_RANK[severity] > SEVERITY_RANK[current["severity"]]:
+                risks_by_key[key] = {"description": description, "severity": severity}
+    # Stable sort keeps document order within each severity
+    risks = sorted(risks_by_key.values(), key=lambda r: -SEVERITY_RANK[r["severity"]])[:max_risks]
+
+    return {
+        "parties": parties or "Client: [Not clearly specified], Contractor: [Not clearly specified]",
+        "contract_value": contract_value or "Not specified",
+        "start_date": start_date or "Not specified",
+        "end_date": end_date or "Not specified",
+        "key_terms": key_terms[:max_terms],
+        "risks": risks,
+        "risk_score": calculate_risk_score(risks),
+    }
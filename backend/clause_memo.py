@@ -0,0 +1,164 @@
+"""Clause-level memoization of LLM findings.
+
+Standard-form contracts repeat the same payment, retention, defects
+liability and force majeure clauses word for word. With
+``ANALYSIS_MODE=clauses`` the contract is segmented into clauses (see
+context_selection.segment_clauses), and each clause is hashed after
+normalization (case, numbering, punctuation and PDF spacing artifacts do
+not matter). Key terms and risks found in a clause are stored in
+``clause_analyses`` under that hash. Only clauses never seen before are
+sent to the LLM, several to a prompt.
+"""
+import hashlib
+import json
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from chunked_analysis import SEVERITY_RANK
+
+# Bump when the clause prompt changes so stored findings are not reused
+CLAUSE_PROMPT_VERSION = "1"
+
+clause_table = Table(
+    "clause_analyses", MetaData(),
+    Column("clause_hash", String(64), primary_key=True),
+    Column("key_terms", Text, nullable=False),
+    Column("risks", Text, nullable=False),
+    Column("hits", Integer, nullable=False, default=0),
+    Column("created_at", DateTime, nullable=False),
+    Column("last_used_at", DateTime, nullable=False),
+)
+
+# ============ HASHING ============
+_NUMBERING = re.compile(r"^\s*(?:(?:clause|article|section)\s+[\divx]+|\d+(?:\.\d+)*)[.:)]?\s*", re.IGNORECASE)
+_WORD_CHARS = re.compile(r"[a-z0-9₹$€£%]+")
+
+def normalize_clause(text: str) -> str:
+    """Clause text without numbering, case, punctuation or whitespace"""
+    return "".join(_WORD_CHARS.findall(_NUMBERING.sub("", text.lower())))
+
+def clause_hash(text: str, model: str) -> str:
+    digest = hashlib.sha256(f"{CLAUSE_PROMPT_VERSION}\0{model}\0".encode("utf-8"))
+    digest.update(normalize_clause(text).encode("utf-8"))
+    return digest.hexdigest()
+
+# ============ PROMPTS ============
+def _pack(clauses: list, char_budget: int) -> list:
+    batches = []
+    size = 0
+    for clause in clauses:
+        if batches and size + len(clause.text) <= char_budget:
+            batches[-1].append(clause)
+            size += len(clause.text)
+        else:
+            batches.append([clause])
+            size = len(clause.text)
+    return batches
+
+def batch_clauses(clauses: list, char_budget: int, max_batches: int = None, max_budget: int = None) -> list:
+    """Consecutive clauses grouped into prompts of about ``char_budget`` characters.
+
+    If that takes more than ``max_batches`` prompts, the budget grows, up to
+    ``max_budget``, until they fit. Clauses that still do not fit are left
+    out of the returned batches.
+    """
+    batches = _pack(clauses, char_budget)
+    while max_batches and len(batches) > max_batches and (max_budget is None or char_budget < max_budget):
+        char_budget = char_budget * len(batches) // max_batches + 1
+        if max_budget is not None:
+            char_budget = min(char_budget, max_budget)
+        batches = _pack(clauses, char_budget)
+    return batches[:max_batches] if max_batches else batches
+
+def build_clause_prompt(batch: list) -> str:
+    """Prompt asking for the key terms and risks of each clause in ``batch``"""
+    numbered = "\n\n".join(f"[C{n}]\n{clause.text}" for n, clause in enumerate(batch, 1))
+    return f"""Review these clauses from a construction contract. For each clause, list its key terms (important obligations, amounts, deadlines) and the risks it creates, with severity low/medium/high. Use empty lists for a clause with nothing notable.
+
+{numbered}
+
+You must return ONLY valid JSON in this exact format (no markdown, no extra text):
+{{
+    "clauses": [
+        {{"id": "C1", "key_terms": ["term1"], "risks": [{{"description": "risk description", "severity": "high"}}]}},
+        {{"id": "C2", "key_terms": [], "risks": []}}
+    ]
+}}"""
+
+def findings_from_reply(data: dict, batch: list, hashes: dict) -> dict:
+    """{clause_hash: {"key_terms": [...], "risks": [...]}} for every clause the reply covers"""
+    findings = {}
+    for entry in (data.get("clauses") or []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            clause = batch[int(str(entry.get("id", "")).lstrip("Cc")) - 1]
+        except (ValueError, IndexError):
+            continue
+        risks = []
+        for risk in entry.get("risks") or []:
+            if isinstance(risk, dict) and risk.get("description"):
+                severity = str(risk.get("severity", "low")).lower()
+                risks.append({"description": str(risk["description"]),
+                              "severity": severity if severity in SEVERITY_RANK else "low"})
+        key_terms = [str(term) for term in entry.get("key_terms") or [] if term]
+        findings[hashes[id(clause)]] = {"key_terms": key_terms, "risks": risks}
+    return findings
+
+# ============ STORAGE ============
+def load_findings(conn, hashes) -> dict:
+    """Stored findings of the given clause hashes"""
+    found = {}
+    hashes = list(hashes)
+    for start in range(0, len(hashes), 500):
+        rows = conn.execute(
+            select(clause_table.c.clause_hash, clause_table.c.key_terms, clause_table.c.risks)
+            .where(clause_table.c.clause_hash.in_(hashes[start:start + 500]))
+        )
+        for clause_hash_, key_terms, risks in rows:
+            found[clause_hash_] = {"key_terms": json.loads(key_terms), "risks": json.loads(risks)}
+    return found
+
+def store_findings(conn, findings: dict, reused=(), replace: bool = False):
+    """Save new clause findings and count reuses of stored ones.
+
+    ``replace`` overwrites stored findings of the same clauses, for forced
+    re-analyses; otherwise the first stored copy is kept.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"clause_hash": h, "key_terms": json.dumps(f["key_terms"]), "risks": json.dumps(f["risks"]),
+         "hits": 0, "created_at": now, "last_used_at": now}
+        for h, f in sorted(findings.items())
+    ]
+    if rows:
+        # Another worker may have stored the same clause meanwhile; its copy is as good
+        dialect = conn.dialect.name
+        if dialect == "mysql":
+            if replace:
+                statement = mysql_insert(clause_table)
+                statement = statement.on_duplicate_key_update(
+                    key_terms=statement.inserted.key_terms, risks=statement.inserted.risks, last_used_at=now
+                )
+            else:
+                statement = clause_table.insert().prefix_with("IGNORE")
+        else:
+            statement = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(clause_table)
+            if replace:
+                statement = statement.on_conflict_do_update(index_elements=["clause_hash"], set_={
+                    "key_terms": statement.excluded.key_terms, "risks": statement.excluded.risks, "last_used_at": now
+                })
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=["clause_hash"])
+        conn.execute(statement, rows)
+    reused = sorted(set(reused))
+    if reused:
+        conn.execute(
+            clause_table.update().where(clause_table.c.clause_hash.in_(reused))
+            .values(hits=clause_table.c.hits + 1, last_used_at=now)
+        )
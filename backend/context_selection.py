@@ -0,0 +1,172 @@
+"""Relevance-ranked context packing for the analysis prompt.
+
+Instead of sending the first N characters (usually the cover page, recitals
+and definitions), the contract is segmented into clauses, every clause is
+scored against weighted keyword groups for the fields the prompt extracts,
+and the best clauses are packed into a token budget. Everything runs
+locally on the CPU in a few milliseconds.
+
+Scoring is TF-IDF over the keyword vocabulary: one compiled pattern counts
+all keyword hits of a clause in a single pass, keywords that appear in most
+clauses are damped by their inverse document frequency, and the score is
+normalized by clause length so long boilerplate does not win by size.
+"""
+import math
+import re
+
+from llm_gateway import CHARS_PER_TOKEN
+
+MIN_CLAUSE_CHARS = 80
+MAX_CLAUSE_CHARS = 1500
+
+# ============ KEYWORD WEIGHTS ============
+CATEGORY_KEYWORDS = {
+    "parties": (2.0, ["between", "parties", "party", "client", "contractor", "employer", "owner",
+                      "hereinafter", "sub-contractor", "subcontractor", "consultant"]),
+    "payment": (2.0, ["payment", "payments", "paid", "payable", "invoice", "advance", "retention",
+                      "instalment", "installment", "contract value", "contract price", "amount",
+                      "lakh", "crore", "rupees", "inr", "rs", "usd", "gst", "escalation"]),
+    "dates": (1.5, ["commencement", "commence", "completion", "start date", "end date", "duration",
+                    "months", "weeks", "days", "timeline", "schedule", "milestone", "handover",
+                    "effective date"]),
+    "liability": (1.5, ["liability", "liable", "indemnify", "indemnity", "insurance", "warranty",
+                        "defects", "defect liability", "guarantee", "bank guarantee", "damages"]),
+    "penalties": (2.0, ["penalty", "penalties", "liquidated damages", "delay", "deduction",
+                        "forfeit", "forfeiture", "late", "interest"]),
+    "termination": (1.5, ["terminate", "termination", "breach", "suspension", "suspend", "default",
+                          "dispute", "arbitration", "force majeure", "notice"]),
+}
+
+_KEYWORD_WEIGHTS = {}
+for _weight, _keywords in CATEGORY_KEYWORDS.values():
+    for _keyword in _keywords:
+        _KEYWORD_WEIGHTS[_keyword] = max(_KEYWORD_WEIGHTS.get(_keyword, 0.0), _weight)
+
+# Longest keywords first so "liquidated damages" wins over "damages"
+_KEYWORD_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(k) for k in sorted(_KEYWORD_WEIGHTS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+_AMOUNT_PATTERN = re.compile(r"(₹|\$|rs\.?|inr|usd)\s?\d", re.IGNORECASE)
+_DATE_PATTERN = re.compile(
+    r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|"
+    r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2},? \d{4}|"
+    r"\d{1,2}(st|nd|rd|th)? (jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*,? \d{4})\b",
+    re.IGNORECASE,
+)
+
+# Clause headings: "1.", "12.3", "Clause 4", "ARTICLE V", "PAYMENT TERMS:"
+_HEADING_PATTERN = re.compile(
+    r"^\s*(?:(?i:clause|article|section)\s+[\dIVXivx]+|\d+(?:\.\d+)*[.)]\s|[A-Z][A-Z &/\-]{3,}:?\s*$)",
+    re.MULTILINE,
+)
+
+# ============ SEGMENTATION ============
+class Clause:
+    """A contiguous span of the contract text"""
+
+    def __init__(self, index: int, start: int, text: str):
+        self.index = index
+        self.start = start
+        self.text = text
+        self.score = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return len(self.text) // CHARS_PER_TOKEN + 1
+
+def _split_long(text: str, start: int) -> list:
+    """Break an oversized block at paragraph or sentence boundaries"""
+    pieces = []
+    while len(text) > MAX_CLAUSE_CHARS:
+        cut = text.rfind("\n", 0, MAX_CLAUSE_CHARS)
+        if cut < MIN_CLAUSE_CHARS:
+            cut = text.rfind(". ", 0, MAX_CLAUSE_CHARS) + 1
+        if cut < MIN_CLAUSE_CHARS:
+            cut = MAX_CLAUSE_CHARS
+        pieces.append((start, text[:cut]))
+        start += cut
+        text = text[cut:]
+    pieces.append((start, text))
+    return pieces
+
+def segment_clauses(text: str) -> list:
+    """Split contract text into clauses at headings and blank lines"""
+    boundaries = {0, len(text)}
+    boundaries.update(m.start() for m in _HEADING_PATTERN.finditer(text))
+    boundaries.update(m.end() for m in re.finditer(r"\n\s*\n", text))
+    points = sorted(boundaries)
+
+    blocks = []
+    for start, end in zip(points, points[1:]):
+        block = text[start:end]
+        if not block.strip():
+            continue
+        # Glue short fragments (stray headings, signature lines) to the previous block
+        if blocks and len(blocks[-1][1].strip()) < MIN_CLAUSE_CHARS:
+            previous_start, previous = blocks.pop()
+            blocks.append((previous_start, previous + block))
+        else:
+            blocks.append((start, block))
+
+    clauses = []
+    for start, block in blocks:
+        for piece_start, piece in _split_long(block, start):
+            if piece.strip():
+                clauses.append(Clause(len(clauses), piece_start, piece.strip()))
+    return clauses
+
+# ============ SCORING ============
+def score_clauses(clauses: list) -> list:
+    """Attach a TF-IDF keyword relevance score to every clause"""
+    counts = []
+    document_frequency = {}
+    for clause in clauses:
+        clause_counts = {}
+        for match in _KEYWORD_PATTERN.finditer(clause.text):
+            keyword = match.group(1).lower()
+            clause_counts[keyword] = clause_counts.get(keyword, 0) + 1
+        for keyword in clause_counts:
+            document_frequency[keyword] = document_frequency.get(keyword, 0) + 1
+        counts.append(clause_counts)
+
+    total = len(clauses) or 1
+    idf = {k: math.log((1 + total) / (1 + df)) + 1.0 for k, df in document_frequency.items()}
+
+    for clause, clause_counts in zip(clauses, counts):
+        score = sum(
+            (1 + math.log(tf)) * idf[keyword] * _KEYWORD_WEIGHTS[keyword]
+            for keyword, tf in clause_counts.items()
+        )
+        # Concrete amounts and dates are what the prompt asks for
+        score += 3.0 * len(_AMOUNT_PATTERN.findall(clause.text))
+        score += 2.0 * len(_DATE_PATTERN.findall(clause.text))
+        clause.score = score / math.sqrt(max(clause.tokens, 1))
+    return clauses
+
+# ============ PACKING ============
+def pack_context(text: str, token_budget: int) -> str:
+    """Highest-value clauses that fit the budget, in document order"""
+    if len(text) // CHARS_PER_TOKEN <= token_budget:
+        return text
+
+    clauses = score_clauses(segment_clauses(text))
+    if not clauses:
+        return text[:token_budget * CHARS_PER_TOKEN]
+
+    # The opening clause names the parties in almost every contract
+    clauses[0].score *= 1.5
+
+    selected = []
+    used = 0
+    for clause in sorted(clauses, key=lambda c: c.score, reverse=True):
+        if clause.score <= 0:
+            break
+        if used + clause.tokens <= token_budget:
+            selected.append(clause)
+            used += clause.tokens
+
+    if not selected:
+        return text[:token_budget * CHARS_PER_TOKEN]
+    selected.sort(key=lambda c: c.index)
+    return "\n\n".join(c.text for c in selected)
@@ -0,0 +1,119 @@
+"""Streaming writers for the bulk analysis export.
+
+Each writer takes an iterable of row batches (lists of dicts keyed by
+``EXPORT_COLUMNS``) and yields encoded chunks, one per batch, so the
+response is produced while the database cursor is still being read and
+memory use does not grow with the number of analyses. Parquet goes through
+pyarrow, imported lazily since only that format needs it.
+"""
+import csv
+import io
+
+import orjson
+
+EXPORT_COLUMNS = [
+    "contract_id", "filename", "upload_date", "status",
+    "parties", "contract_value", "value_amount", "value_currency",
+    "start_date", "end_date", "start_on", "end_on",
+    "risk_score", "key_terms", "risks", "analyzed_at",
+]
+# key_terms and risks are stored as JSON text; NDJSON nests them, CSV and
+# Parquet keep the JSON text in a string column
+JSON_COLUMNS = ("key_terms", "risks")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# ============ NDJSON & CSV ============
+def write_ndjson(batches):
+    for batch in batches:
+        lines = []
+        for row in batch:
+            row = dict(row, **{c: orjson.loads(row[c] or "[]") for c in JSON_COLUMNS})
+            lines.append(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+        yield b"".join(lines)
+
+def write_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+# ============ PARQUET ============
+class _ChunkSink:
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("contract_id", pa.int64()),
+        ("filename", pa.string()),
+        ("upload_date", pa.timestamp("us")),
+        ("status", pa.string()),
+        ("parties", pa.string()),
+        ("contract_value", pa.string()),
+        ("value_amount", pa.float64()),
+        ("value_currency", pa.string()),
+        ("start_date", pa.string()),
+        ("end_date", pa.string()),
+        ("start_on", pa.date32()),
+        ("end_on", pa.date32()),
+        ("risk_score", pa.float64()),
+        ("key_terms", pa.string()),
+        ("risks", pa.string()),
+        ("analyzed_at", pa.timestamp("us")),
+    ])
+
+def write_parquet(batches):
+    """One row group per batch, flushed to the client as soon as it is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        # Writes the footer; an export with no rows is still a valid file
+        writer.close()
+    yield sink.drain()
+
+WRITERS = {"ndjson": write_ndjson, "csv": write_csv, "parquet": write_parquet}
@@ -0,0 +1,134 @@
+"""Persistent cache of LLM responses.
+
+Responses are stored in a local SQLite file keyed by a hash of (model,
+temperature, max_tokens, prompt), so re-running an analysis with a
+byte-identical prompt — after a retry, a backfill or in tests — costs
+neither latency nor quota. Entries expire after a TTL and the least
+recently used ones are evicted once the entry or size limit is exceeded.
+Hit/miss/eviction counters live in the same file so every worker process
+shares them.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# ============ CONFIG ============
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./data/llm_cache.db")
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "100"))
+
+# ============ CACHE ============
+def cache_key(model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{model}\0{temperature}\0{max_tokens}\0".encode("utf-8"))
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+class LLMResponseCache:
+    """SQLite-backed LRU + TTL cache of completion texts"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at ON llm_responses (accessed_at);
+            CREATE TABLE IF NOT EXISTS llm_cache_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def _count(self, name: str, amount: int = 1):
+        self.conn.execute(
+            "INSERT INTO llm_cache_counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, key: str):
+        """Cached response text, or None on a miss or an expired entry"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                self.conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._count("hits")
+                return row[0]
+            if row:
+                self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._count("expired")
+            self._count("misses")
+            return None
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones over the limits"""
+        evicted = self.conn.execute(
+            "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        while entries > self.max_entries or size > self.max_bytes:
+            # Evict in batches so a full cache is not trimmed one row per insert
+            batch = max(entries - self.max_entries, 1, self.max_entries // 100)
+            rows = self.conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY accessed_at LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            self.conn.executemany("DELETE FROM llm_responses WHERE key = ?", [(r[0],) for r in rows])
+            evicted += len(rows)
+            entries -= len(rows)
+            size -= sum(r[1] for r in rows)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            counters = dict(self.conn.execute("SELECT name, value FROM llm_cache_counters").fetchall())
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+            "hit_rate": round(counters.get("hits", 0) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> int:
+        """Drop every cached response, returning how many there were"""
+        with self.lock:
+            return self.conn.execute("DELETE FROM llm_responses").rowcount
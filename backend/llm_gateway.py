@@ -0,0 +1,239 @@
+"""Async gateway to the Groq API.
+
+All LLM traffic of a process goes through one ``LLMGateway``. It owns an
+event loop on a background thread with a single pooled ``httpx.AsyncClient``
+and ``AsyncGroq`` client, so worker threads share keep-alive connections
+instead of each opening their own. Every call first waits on a token-bucket
+scheduler that tracks requests and tokens per minute, so bursts queue up
+inside the quota rather than failing. 429s and transient errors are retried
+with exponential backoff and full jitter, honouring Retry-After.
+
+The buckets are per process. When several processes share one Groq account,
+set LLM_RPM_LIMIT and LLM_TPM_LIMIT to each one's share of the quota.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+from groq import AsyncGroq, APIConnectionError, APIStatusError, RateLimitError
+
+from llm_cache import LLM_CACHE_BYPASS, cache_key
+
+# ============ CONFIG ============
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "30"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "12000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# Rough token estimate, also used to budget prompts (context_selection, app)
+CHARS_PER_TOKEN = 4
+
+class LLMUnavailableError(Exception):
+    """The LLM could not be reached within the retry budget"""
+
+# ============ RATE LIMITING ============
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) units after the fact"""
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets with a FIFO queue"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.queue = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        # Holding the lock while waiting makes callers line up in arrival order
+        async with self.queue:
+            while True:
+                wait = max(
+                    self.blocked_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after a 429 with Retry-After"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage is known"""
+        self.tokens.adjust(estimated - actual)
+
+# ============ GATEWAY ============
+def _retry_after(error: APIStatusError):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+def _valid(content: str, validate) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+        return True
+    except Exception:
+        return False
+
+class LLMGateway:
+    """Shared, rate-limited, retrying access to Groq chat completions"""
+
+    def __init__(self, api_key: str = None, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self.thread.start()
+        self.client = None
+        self.http_client = None
+        self.limiter = None
+        self.slots = None
+
+    async def _ensure_client(self):
+        if self.client is None:
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=LLM_TIMEOUT_SECONDS,
+            )
+            # Retries are handled here so they go through the rate limiter
+            self.client = AsyncGroq(api_key=self.api_key, http_client=self.http_client, max_retries=0)
+        if self.limiter is None:
+            self.limiter = RateLimiter(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+            self.slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    async def acomplete(self, prompt: str, model: str, temperature: float = 0.3, max_tokens: int = 1000,
+                        use_cache: bool = True, validate=None) -> str:
+        """Chat completion text for a single user prompt.
+
+        ``use_cache=False`` skips the cache lookup but still stores the fresh reply.
+        With ``validate``, only replies it accepts (does not raise on) are
+        cached or served from the cache, so a truncated reply is asked again.
+        """
+        key = None
+        if self.cache is not None:
+            key = cache_key(model, temperature, max_tokens, prompt)
+            if use_cache and not LLM_CACHE_BYPASS:
+                cached = await asyncio.to_thread(self.cache.get, key)
+                if cached is not None and _valid(cached, validate):
+                    return cached
+
+        await self._ensure_client()
+        estimated = len(prompt) // CHARS_PER_TOKEN + max_tokens
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self.limiter.acquire(estimated)
+            try:
+                async with self.slots:
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+            except Exception as e:
+                if not _is_transient(e):
+                    raise
+                if attempt == LLM_MAX_RETRIES:
+                    raise LLMUnavailableError(f"Groq unavailable after {attempt + 1} attempts: {e}") from e
+
+                delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                retry_after = _retry_after(e) if isinstance(e, APIStatusError) else None
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if isinstance(e, RateLimitError):
+                    # Rejected calls do not count against the token quota
+                    self.limiter.settle(estimated, 0)
+                    self.limiter.pause(delay)
+                print(f"⏳ Groq call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.limiter.settle(estimated, usage.total_tokens)
+            content = response.choices[0].message.content
+            if key is not None and content and _valid(content, validate):
+                await asyncio.to_thread(self.cache.put, key, model, content)
+            return content
+
+    def run(self, coroutine):
+        """Run a coroutine on the gateway loop from any thread and wait for it"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def complete(self, prompt: str, model: str, temperature: float = 0.3, max_tokens: int = 1000,
+                 use_cache: bool = True, validate=None) -> str:
+        """Blocking wrapper around acomplete for worker threads"""
+        return self.run(self.acomplete(prompt, model, temperature, max_tokens, use_cache, validate))
+
+    def complete_many(self, prompts: list, model: str, parallelism: int, temperature: float = 0.3,
+                      max_tokens: int = 1000, use_cache: bool = True, validate=None) -> list:
+        """Run several prompts concurrently, at most ``parallelism`` at a time.
+
+        Failed calls come back as the exception instance instead of raising.
+        """
+        async def run_all():
+            limit = asyncio.Semaphore(max(1, parallelism))
+
+            async def one(prompt):
+                async with limit:
+                    return await self.acomplete(prompt, model, temperature, max_tokens, use_cache, validate)
+
+            return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
+
+        return self.run(run_all())
+
+    def close(self):
+        async def shutdown():
+            if self.http_client is not None:
+                await self.http_client.aclose()
+
+        if self.loop.is_running():
+            self.run(shutdown())
+            self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,418 @@
+"""Versioned schema migrations.
+
+Every schema change is an entry in ``MIGRATIONS``; applied versions are
+recorded in ``schema_migrations`` so each one runs exactly once per database.
+Steps are written with idempotent helpers (create the table, column or index
+only if it is missing), which lets databases created by the old
+``create_all`` + ``upgrade_schema`` code be adopted without special cases.
+A lock serializes replicas that start at the same time.
+
+Run manually with ``python -m migrations`` (set ``MIGRATE_ON_STARTUP=false``
+on the API and workers to make this the only place migrations run).
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+import json
+
+from sqlalchemy import (BigInteger, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary,
+                        MetaData, Numeric, String, Table, Text, bindparam, inspect, select, text as sql_text)
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+from chunked_analysis import SEVERITY_RANK
+from near_duplicates import band_keys, minhash
+from normalization import parse_amount, parse_date
+from portfolio_stats import rebuild_stats
+
+MIGRATION_LOCK_NAME = "schema_migrations"
+MIGRATION_LOCK_KEY = 7301  # pg_advisory_lock key
+
+# ============ HELPERS ============
+def _reflect(conn) -> MetaData:
+    metadata = MetaData()
+    metadata.reflect(bind=conn)
+    return metadata
+
+def create_table(conn, name: str, *columns):
+    if not inspect(conn).has_table(name):
+        # Reflect first so foreign keys can resolve the tables they point at
+        Table(name, _reflect(conn), *columns).create(conn)
+
+def add_column(conn, table: str, column: Column):
+    if column.name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        quote = conn.dialect.identifier_preparer.quote
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(sql_text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column.name)} {column_type}"))
+
+def create_index(conn, table: str, name: str, *columns: str, unique: bool = False):
+    if name not in {i["name"] for i in inspect(conn).get_indexes(table)}:
+        reflected = Table(table, MetaData(), autoload_with=conn)
+        Index(name, *(reflected.c[c] for c in columns), unique=unique).create(conn)
+
+# ============ MIGRATIONS ============
+def initial_schema(conn):
+    create_table(
+        conn, "contracts",
+        Column("id", Integer, primary_key=True),
+        Column("filename", String(255), nullable=False),
+        Column("upload_date", DateTime),
+        Column("status", String(50)),
+        Column("file_path", String(500)),
+    )
+    create_index(conn, "contracts", "ix_contracts_id", "id")
+    create_table(
+        conn, "analysis_results",
+        Column("id", Integer, primary_key=True),
+        Column("contract_id", Integer, ForeignKey("contracts.id")),
+        Column("parties", Text),
+        Column("contract_value", String(100)),
+        Column("start_date", String(50)),
+        Column("end_date", String(50)),
+        Column("key_terms", Text),
+        Column("risks", Text),
+        Column("risk_score", Float),
+        Column("analyzed_at", DateTime),
+    )
+    create_index(conn, "analysis_results", "ix_analysis_results_id", "id")
+
+def content_hash(conn):
+    add_column(conn, "contracts", Column("content_hash", String(64)))
+    create_index(conn, "contracts", "ix_contracts_content_hash", "content_hash")
+
+def analysis_jobs(conn):
+    create_table(
+        conn, "analysis_jobs",
+        Column("id", Integer, primary_key=True),
+        Column("contract_id", Integer, ForeignKey("contracts.id"), unique=True, nullable=False),
+        Column("status", String(20)),
+        Column("attempts", Integer),
+        Column("force", Boolean),
+        Column("lease_token", String(32)),
+        Column("leased_by", String(100)),
+        Column("lease_expires_at", DateTime),
+        Column("error", Text),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    create_index(conn, "analysis_jobs", "ix_analysis_jobs_id", "id")
+    create_index(conn, "analysis_jobs", "ix_analysis_jobs_status", "status")
+    create_index(conn, "analysis_jobs", "ix_analysis_jobs_lease_token", "lease_token")
+    create_index(conn, "analysis_jobs", "ix_analysis_jobs_lease_expires_at", "lease_expires_at")
+
+def list_indexes(conn):
+    create_index(conn, "contracts", "ix_contracts_upload_date_id", "upload_date", "id")
+    create_index(conn, "contracts", "ix_contracts_status_upload_date_id", "status", "upload_date", "id")
+    create_index(conn, "contracts", "ix_contracts_filename", "filename")
+    create_index(conn, "analysis_results", "ix_analysis_results_contract_id", "contract_id")
+    create_index(conn, "analysis_results", "ix_analysis_results_risk_score_contract_id", "risk_score", "contract_id")
+
+# Plain-text key terms and risk descriptions out of the JSON columns of {row}
+_FTS_KEY_TERMS = (
+    "CASE WHEN json_valid({row}.key_terms) "
+    "THEN (SELECT group_concat(value, ' ') FROM json_each({row}.key_terms)) ELSE {row}.key_terms END"
+)
+_FTS_RISKS = (
+    "CASE WHEN json_valid({row}.risks) "
+    "THEN (SELECT group_concat(json_extract(value, '$.description'), ' ') FROM json_each({row}.risks)) "
+    "ELSE {row}.risks END"
+)
+
+def _fts_row_insert(row: str, table: str = "contract_search") -> str:
+    return (
+        f"INSERT INTO {table} (rowid, filename, parties, key_terms, risks, body) "
+        f"SELECT c.id, c.filename, {row}.parties, {_FTS_KEY_TERMS.format(row=row)}, {_FTS_RISKS.format(row=row)}, "
+        "COALESCE(t.text, '') "
+        "FROM contracts c LEFT JOIN contract_texts t ON t.contract_id = c.id "
+        f"WHERE c.id = {row}.contract_id"
+    )
+
+def _has_fts5(conn) -> bool:
+    options = {row[0] for row in conn.execute(sql_text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in options
+
+def full_text_search(conn):
+    create_table(
+        conn, "contract_texts",
+        Column("contract_id", Integer, ForeignKey("contracts.id"), primary_key=True, autoincrement=False),
+        Column("text", Text().with_variant(LONGTEXT(), "mysql")),
+        Column("created_at", DateTime),
+    )
+    if conn.dialect.name != "sqlite" or not _has_fts5(conn):
+        return  # search falls back to LIKE
+
+    conn.execute(sql_text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS contract_search USING fts5("
+        "filename, parties, key_terms, risks, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+    ))
+    # One row per analyzed contract (rowid = contract id), maintained on insert
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_analysis_insert AFTER INSERT ON analysis_results BEGIN "
+        "DELETE FROM contract_search WHERE rowid = NEW.contract_id; "
+        f"{_fts_row_insert('NEW')}; "
+        "END"
+    ))
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_analysis_delete AFTER DELETE ON analysis_results BEGIN "
+        "DELETE FROM contract_search WHERE rowid = OLD.contract_id; "
+        "END"
+    ))
+    # The text and the analysis of a contract are written in the same transaction, in either order
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_text_insert AFTER INSERT ON contract_texts BEGIN "
+        "UPDATE contract_search SET body = NEW.text WHERE rowid = NEW.contract_id; "
+        "END"
+    ))
+    # Index what was analyzed before this migration (without body text, which was never kept)
+    conn.execute(sql_text(
+        "INSERT INTO contract_search (rowid, filename, parties, key_terms, risks, body) "
+        f"SELECT c.id, c.filename, a.parties, {_FTS_KEY_TERMS.format(row='a')}, {_FTS_RISKS.format(row='a')}, '' "
+        "FROM analysis_results a JOIN contracts c ON c.id = a.contract_id "
+        "WHERE a.id IN (SELECT MAX(id) FROM analysis_results GROUP BY contract_id) "
+        "AND c.id NOT IN (SELECT rowid FROM contract_search)"
+    ))
+
+def typed_analysis_fields(conn):
+    add_column(conn, "analysis_results", Column("value_amount", Numeric(18, 2)))
+    add_column(conn, "analysis_results", Column("value_currency", String(3)))
+    add_column(conn, "analysis_results", Column("start_on", Date))
+    add_column(conn, "analysis_results", Column("end_on", Date))
+    create_index(conn, "analysis_results", "ix_analysis_results_value", "value_currency", "value_amount", "contract_id")
+    create_index(conn, "analysis_results", "ix_analysis_results_end_on", "end_on", "contract_id")
+    create_table(
+        conn, "analysis_risks",
+        Column("id", Integer, primary_key=True),
+        Column("analysis_id", Integer, ForeignKey("analysis_results.id"), nullable=False),
+        Column("contract_id", Integer, ForeignKey("contracts.id"), nullable=False),
+        Column("severity", String(10), nullable=False),
+        Column("description", Text),
+    )
+    create_index(conn, "analysis_risks", "ix_analysis_risks_analysis_id", "analysis_id")
+    create_index(conn, "analysis_risks", "ix_analysis_risks_severity_contract_id", "severity", "contract_id")
+
+    # Backfill from the text columns of existing analyses
+    metadata = _reflect(conn)
+    results = metadata.tables["analysis_results"]
+    risks = metadata.tables["analysis_risks"]
+    rows = conn.execute(select(
+        results.c.id, results.c.contract_id, results.c.contract_value,
+        results.c.start_date, results.c.end_date, results.c.risks
+    )).all()
+    updates, risk_rows = [], []
+    for row in rows:
+        amount, currency = parse_amount(row.contract_value)
+        updates.append({
+            "row_id": row.id, "value_amount": amount, "value_currency": currency,
+            "start_on": parse_date(row.start_date), "end_on": parse_date(row.end_date),
+        })
+        try:
+            parsed = json.loads(row.risks or "[]")
+        except ValueError:
+            parsed = []
+        for risk in parsed if isinstance(parsed, list) else []:
+            if isinstance(risk, dict):
+                severity = str(risk.get("severity", "low")).lower()
+                risk_rows.append({
+                    "analysis_id": row.id, "contract_id": row.contract_id,
+                    "severity": severity if severity in SEVERITY_RANK else "low",
+                    "description": str(risk.get("description", "")),
+                })
+    if updates:
+        conn.execute(results.update().where(results.c.id == bindparam("row_id")).values(
+            value_amount=bindparam("value_amount"), value_currency=bindparam("value_currency"),
+            start_on=bindparam("start_on"), end_on=bindparam("end_on"),
+        ), updates)
+    if risk_rows:
+        conn.execute(risks.insert(), risk_rows)
+
+def portfolio_stats(conn):
+    create_table(
+        conn, "portfolio_stats",
+        Column("metric", String(50), primary_key=True),
+        Column("bucket", String(50), primary_key=True),
+        Column("value", Numeric(20, 2), nullable=False),
+    )
+    rebuild_stats(conn)
+
+def job_progress(conn):
+    add_column(conn, "analysis_jobs", Column("stage", String(20)))
+    add_column(conn, "analysis_jobs", Column("stage_detail", String(200)))
+
+def clause_analyses(conn):
+    create_table(
+        conn, "clause_analyses",
+        Column("clause_hash", String(64), primary_key=True),
+        Column("key_terms", Text, nullable=False),
+        Column("risks", Text, nullable=False),
+        Column("hits", Integer, nullable=False, default=0),
+        Column("created_at", DateTime, nullable=False),
+        Column("last_used_at", DateTime, nullable=False),
+    )
+
+def near_duplicate_index(conn):
+    create_table(
+        conn, "contract_signatures",
+        Column("contract_id", Integer, ForeignKey("contracts.id"), primary_key=True, autoincrement=False),
+        Column("signature", LargeBinary, nullable=False),
+        Column("created_at", DateTime),
+    )
+    create_table(
+        conn, "lsh_buckets",
+        Column("bucket", BigInteger, primary_key=True, autoincrement=False),
+        Column("contract_id", Integer, ForeignKey("contracts.id"), primary_key=True, autoincrement=False),
+    )
+    create_index(conn, "lsh_buckets", "ix_lsh_buckets_contract_id", "contract_id")
+
+    # Backfill from the stored text of earlier analyses, a batch at a time
+    metadata = _reflect(conn)
+    texts = metadata.tables["contract_texts"]
+    signatures = metadata.tables["contract_signatures"]
+    buckets = metadata.tables["lsh_buckets"]
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(texts.c.contract_id, texts.c.text).where(texts.c.contract_id > last_id)
+            .order_by(texts.c.contract_id).limit(200)
+        ).all()
+        if not rows:
+            break
+        signature_rows, bucket_rows = [], []
+        for row in rows:
+            signature = minhash(row.text or "")
+            if signature is not None:
+                signature_rows.append({"contract_id": row.contract_id, "signature": signature,
+                                       "created_at": datetime.utcnow()})
+                bucket_rows.extend({"bucket": key, "contract_id": row.contract_id} for key in set(band_keys(signature)))
+        if signature_rows:
+            conn.execute(signatures.insert(), signature_rows)
+            conn.execute(buckets.insert(), bucket_rows)
+        last_id = rows[-1].contract_id
+
+def portfolio_stats_precision(conn):
+    # Databases that ran 0007 before it used Numeric have a FLOAT column,
+    # single precision on MySQL, so their currency totals were rounded
+    quote = conn.dialect.identifier_preparer.quote
+    column_type = Numeric(20, 2).compile(dialect=conn.dialect)
+    if conn.dialect.name == "mysql":
+        conn.execute(sql_text(f"ALTER TABLE portfolio_stats MODIFY {quote('value')} {column_type} NOT NULL"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(sql_text(f"ALTER TABLE portfolio_stats ALTER COLUMN {quote('value')} TYPE {column_type}"))
+    rebuild_stats(conn)
+
+def fts_prefix_index(conn):
+    # The porter tokenizer stems prefix queries too ("pay*" becomes "pai*" and
+    # misses "payment"), so prefix terms search an unstemmed copy of the index
+    if conn.dialect.name != "sqlite" or not inspect(conn).has_table("contract_search"):
+        return
+    conn.execute(sql_text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS contract_search_prefix USING fts5("
+        "filename, parties, key_terms, risks, body, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_prefix_analysis_insert AFTER INSERT ON analysis_results BEGIN "
+        "DELETE FROM contract_search_prefix WHERE rowid = NEW.contract_id; "
+        f"{_fts_row_insert('NEW', 'contract_search_prefix')}; "
+        "END"
+    ))
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_prefix_analysis_delete AFTER DELETE ON analysis_results BEGIN "
+        "DELETE FROM contract_search_prefix WHERE rowid = OLD.contract_id; "
+        "END"
+    ))
+    conn.execute(sql_text(
+        "CREATE TRIGGER IF NOT EXISTS contract_search_prefix_text_insert AFTER INSERT ON contract_texts BEGIN "
+        "UPDATE contract_search_prefix SET body = NEW.text WHERE rowid = NEW.contract_id; "
+        "END"
+    ))
+    conn.execute(sql_text(
+        "INSERT INTO contract_search_prefix (rowid, filename, parties, key_terms, risks, body) "
+        "SELECT rowid, filename, parties, key_terms, risks, body FROM contract_search "
+        "WHERE rowid NOT IN (SELECT rowid FROM contract_search_prefix)"
+    ))
+
+def list_index_fixes(conn):
+    # SQLite's LIKE ignores case, so it can only range-scan a NOCASE index, and
+    # PostgreSQL only uses pattern_ops indexes for LIKE outside the C locale
+    if conn.dialect.name == "sqlite":
+        conn.execute(sql_text("DROP INDEX IF EXISTS ix_contracts_filename"))
+        conn.execute(sql_text("CREATE INDEX ix_contracts_filename ON contracts (filename COLLATE NOCASE)"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(sql_text("DROP INDEX IF EXISTS ix_contracts_filename"))
+        conn.execute(sql_text("CREATE INDEX ix_contracts_filename ON contracts (filename varchar_pattern_ops)"))
+    # Covers the per-contract EXISTS probe of the risk_score list filters
+    create_index(conn, "analysis_results", "ix_analysis_results_contract_id_risk_score", "contract_id", "risk_score")
+
+# (version, name, upgrade) - append only, never edit an applied step
+MIGRATIONS = [
+    (1, "initial_schema", initial_schema),
+    (2, "content_hash", content_hash),
+    (3, "analysis_jobs", analysis_jobs),
+    (4, "list_indexes", list_indexes),
+    (5, "full_text_search", full_text_search),
+    (6, "typed_analysis_fields", typed_analysis_fields),
+    (7, "portfolio_stats", portfolio_stats),
+    (8, "job_progress", job_progress),
+    (9, "clause_analyses", clause_analyses),
+    (10, "near_duplicate_index", near_duplicate_index),
+    (11, "portfolio_stats_precision", portfolio_stats_precision),
+    (12, "fts_prefix_index", fts_prefix_index),
+    (13, "list_index_fixes", list_index_fixes),
+]
+
+# ============ RUNNER ============
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+@contextmanager
+def migration_lock(engine):
+    """Serialize migrations across processes sharing one database"""
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.execute(sql_text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        elif dialect == "mysql":
+            conn.execute(sql_text("SELECT GET_LOCK(:name, 300)"), {"name": MIGRATION_LOCK_NAME})
+        # SQLite needs nothing extra: each step runs under the database write lock
+        try:
+            yield
+        finally:
+            if dialect == "postgresql":
+                conn.execute(sql_text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            elif dialect == "mysql":
+                conn.execute(sql_text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+def applied_versions(engine) -> set:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_migrations"):
+            return set()
+        return {row[0] for row in conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version))}
+
+def migrate(engine) -> list:
+    """Apply pending migrations in order, returning the versions applied"""
+    applied = []
+    with migration_lock(engine):
+        schema_migrations.create(engine, checkfirst=True)
+        done = applied_versions(engine)
+        for version, name, upgrade in MIGRATIONS:
+            if version in done:
+                continue
+            # MySQL commits DDL implicitly, which the idempotent helpers tolerate
+            with engine.begin() as conn:
+                upgrade(conn)
+                conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+            applied.append(version)
+            print(f"🔁 Applied migration {version:04d}_{name}")
+    return applied
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from app import write_engine
+
+    if not migrate(write_engine):
+        print("✅ Database schema is up to date")
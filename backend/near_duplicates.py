@@ -0,0 +1,78 @@
+"""MinHash signatures and LSH buckets for finding revised versions of a contract.
+
+A contract's text is reduced to the set of its word ``SHINGLE_WORDS``-grams.
+A MinHash signature of ``MINHASH_BINS`` values estimates the Jaccard
+similarity of two contracts as the share of positions where their
+signatures agree. It is computed with one-permutation hashing: each shingle
+is hashed once, the hash picks a bin and the bin keeps its smallest value.
+That is one hash per shingle instead of one per shingle and permutation,
+which matters without numpy. Bins no shingle fell into borrow the value of
+the next filled bin (rotation densification), so short texts still get a
+full signature.
+
+The signature is cut into ``LSH_BANDS`` bands and each band is hashed to a
+bucket key. Two contracts share a bucket with high probability when they
+are similar (about 0.87 at Jaccard 0.5, above 0.999 at 0.8), so a lookup
+only compares the contracts sharing a bucket instead of the whole table.
+
+Changing these parameters makes stored signatures incomparable; they are
+not configurable for that reason.
+"""
+import hashlib
+import re
+import struct
+
+SHINGLE_WORDS = 5
+MINHASH_BINS = 128
+LSH_BANDS = 32
+ROWS_PER_BAND = MINHASH_BINS // LSH_BANDS
+
+_WORD = re.compile(r"\w+")
+_SIGNATURE_FORMAT = f"<{MINHASH_BINS}Q"
+# Bin values are 64-bit hashes divided by MINHASH_BINS (57 bits); the top 7
+# bits record how far a borrowed value was rotated
+_ROTATION_SHIFT = 57
+
+def shingles(text: str) -> set:
+    """The distinct overlapping word n-grams of ``text``"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    size = min(SHINGLE_WORDS, len(words))
+    return {" ".join(words[i:i + size]).encode("utf-8") for i in range(len(words) - size + 1)}
+
+def minhash(text: str):
+    """Packed MinHash signature of ``text``, or None when it has no words"""
+    bins = [None] * MINHASH_BINS
+    for gram in shingles(text):
+        value, index = divmod(int.from_bytes(hashlib.blake2b(gram, digest_size=8).digest(), "little"), MINHASH_BINS)
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    if all(value is None for value in bins):
+        return None
+
+    signature = list(bins)
+    for index, value in enumerate(bins):
+        if value is None:
+            distance = 1
+            while bins[(index + distance) % MINHASH_BINS] is None:
+                distance += 1
+            signature[index] = bins[(index + distance) % MINHASH_BINS] | (distance << _ROTATION_SHIFT)
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+def band_keys(signature: bytes) -> list:
+    """One signed 64-bit bucket key per band (fits a BIGINT column)"""
+    width = ROWS_PER_BAND * 8
+    return [
+        int.from_bytes(
+            hashlib.blake2b(struct.pack("<H", band) + signature[band * width:(band + 1) * width], digest_size=8).digest(),
+            "little", signed=True,
+        )
+        for band in range(LSH_BANDS)
+    ]
+
+def estimate_jaccard(signature: bytes, other: bytes) -> float:
+    """Share of signature positions on which two contracts agree"""
+    a = struct.unpack(_SIGNATURE_FORMAT, signature)
+    b = struct.unpack(_SIGNATURE_FORMAT, other)
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_BINS
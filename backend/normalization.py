@@ -0,0 +1,110 @@
+"""Normalization of the free-form fields the model returns.
+
+``contract_value`` comes back as text such as "₹2,50,00,000", "Rs. 1.5 crore"
+or "$1,200,000 (USD)", and dates as "2024-03-01", "01/03/2024" or
+"1st March 2024". These helpers turn them into an amount plus an ISO 4217
+currency code and ``datetime.date`` values, so they can be stored in typed,
+indexed columns. Anything that cannot be parsed confidently becomes None.
+"""
+import re
+from datetime import date
+
+# ============ AMOUNTS ============
+SCALE_WORDS = {
+    "crore": 10 ** 7, "crores": 10 ** 7, "cr": 10 ** 7,
+    "lakh": 10 ** 5, "lakhs": 10 ** 5, "lac": 10 ** 5, "lacs": 10 ** 5,
+    "billion": 10 ** 9, "bn": 10 ** 9,
+    "million": 10 ** 6, "mn": 10 ** 6,
+    "thousand": 10 ** 3, "k": 10 ** 3,
+}
+INDIAN_SCALES = {"crore", "crores", "cr", "lakh", "lakhs", "lac", "lacs"}
+
+CURRENCY_CODES = {
+    "₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR", "rupee": "INR", "rupees": "INR",
+    "$": "USD", "us$": "USD", "usd": "USD", "dollar": "USD", "dollars": "USD",
+    "€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pound": "GBP", "pounds": "GBP",
+}
+
+# Digit grouping is not validated: "1,23,45,678" (Indian) and "1,234,567"
+# (Western) both just lose their commas
+_AMOUNT_PATTERN = re.compile(
+    r"(?P<pre>₹|\brs\.?|\binr\b|us\$|\$|\busd\b|€|\beur\b|£|\bgbp\b)?\s*"
+    r"(?P<number>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<scale>crores?|cr\b\.?|lakhs?|lacs?|billion|bn\b|million|mn\b|thousand|k\b)?\s*"
+    r"(?P<post>\binr\b|rupees?|\busd\b|dollars?|\beur\b|euros?|\bgbp\b|pounds?)?",
+    re.IGNORECASE,
+)
+
+def iter_amounts(text: str):
+    """(amount, currency, match) for every monetary value in ``text``, in order"""
+    if not text:
+        return
+
+    for match in _AMOUNT_PATTERN.finditer(text):
+        symbol = (match.group("pre") or match.group("post") or "").lower()
+        scale = (match.group("scale") or "").lower().rstrip(".")
+        try:
+            amount = float(match.group("number").replace(",", "").rstrip("."))
+        except ValueError:
+            continue
+
+        currency = CURRENCY_CODES.get(symbol)
+        if currency is None and scale in INDIAN_SCALES:
+            currency = "INR"
+        # A bare small number is a count or a percentage, not a contract value
+        if currency is None and not scale and amount < 1000:
+            continue
+        yield round(amount * SCALE_WORDS.get(scale, 1), 2), currency, match
+
+def parse_amount(text: str):
+    """(amount, currency) of the first monetary value in ``text``, or (None, None)"""
+    for amount, currency, _ in iter_amounts(text):
+        return amount, currency
+    return None, None
+
+# ============ DATES ============
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b")
+_MONTH_FIRST = re.compile(r"\b([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b", re.IGNORECASE)
+_DAY_FIRST = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]{3,9})\.?,?\s+(\d{4})\b", re.IGNORECASE)
+
+def _make_date(year: int, month: int, day: int):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def parse_date(text: str):
+    """First date in ``text`` as a ``date``, or None.
+
+    Numeric dates are read day-first (01/03/2024 is 1 March) unless only
+    the month-first reading is valid.
+    """
+    if not text:
+        return None
+
+    match = _ISO_DATE.search(text)
+    if match:
+        return _make_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = _NUMERIC_DATE.search(text)
+    if match:
+        first, second, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        if year < 100:
+            year += 2000
+        return _make_date(year, second, first) or _make_date(year, first, second)
+
+    match = _MONTH_FIRST.search(text)
+    if match and match.group(1)[:3].lower() in MONTHS:
+        return _make_date(int(match.group(3)), MONTHS[match.group(1)[:3].lower()], int(match.group(2)))
+
+    match = _DAY_FIRST.search(text)
+    if match and match.group(2)[:3].lower() in MONTHS:
+        return _make_date(int(match.group(3)), MONTHS[match.group(2)[:3].lower()], int(match.group(1)))
+    return None
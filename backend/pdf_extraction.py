@@ -0,0 +1,117 @@
+"""PDF text extraction engine.
+
+Large contracts are split into contiguous page ranges that are extracted in
+a shared process pool, so PyPDF2's pure-Python parsing uses every core. The
+per-page results are joined once, in page order.
+
+When only the beginning of a document is needed, ``extract_within_budget``
+parses pages lazily and stops as soon as the character budget is filled;
+``extract_document(..., start=n)`` picks up the remaining pages later.
+Both accept an ``on_page(done, total)`` callback for progress reporting.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+
+# ============ CONFIG ============
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PAGE_SEPARATOR = "\n"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# ============ DOCUMENT ============
+class ExtractedDocument:
+    """Text of a PDF with per-page text"""
+
+    def __init__(self, pages: list):
+        self.pages = pages
+        self.text = PAGE_SEPARATOR.join(pages)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+# ============ EXTRACTION ============
+def _extract_page_range(file_path: str, start: int, stop: int) -> list:
+    """Extract pages [start, stop) — runs inside a pool process"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps forked children away from the server's threads and locks
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool():
+    """Stop the extraction processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def iter_pages(file_path: str, start: int = 0):
+    """Yield page text one page at a time from page ``start``, parsing each page only when requested"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for index in range(start, len(reader.pages)):
+            yield reader.pages[index].extract_text() or ""
+
+def count_pages(file_path: str) -> int:
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def extract_document(file_path: str, workers: int = None, on_page=None, start: int = 0) -> ExtractedDocument:
+    """Extract all pages from ``start`` on, in parallel when there are enough of them"""
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    page_count = count_pages(file_path)
+    remaining = max(page_count - start, 0)
+
+    if workers <= 1 or remaining < PDF_PARALLEL_MIN_PAGES:
+        pages = []
+        for page in iter_pages(file_path, start):
+            pages.append(page)
+            if on_page:
+                on_page(start + len(pages), page_count)
+        return ExtractedDocument(pages)
+
+    # One contiguous range per worker: every task re-reads the xref table,
+    # so fewer, larger ranges beat one task per page.
+    ranges_count = min(workers, remaining)
+    bounds = [start + remaining * i // ranges_count for i in range(ranges_count + 1)]
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_extract_page_range, file_path, bounds[i], bounds[i + 1])
+        for i in range(ranges_count)
+    ]
+
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+        if on_page:
+            on_page(start + len(pages), page_count)
+    return ExtractedDocument(pages)
+
+def extract_within_budget(file_path: str, max_chars: int = None, on_page=None) -> ExtractedDocument:
+    """Extract pages in order until the character budget is full"""
+    total_pages = count_pages(file_path)
+
+    pages = []
+    length = 0
+    for page in iter_pages(file_path):
+        pages.append(page)
+        length += len(page) + len(PAGE_SEPARATOR)
+        if on_page:
+            on_page(len(pages), total_pages)
+        if max_chars is not None and length >= max_chars:
+            break
+    return ExtractedDocument(pages)
@@ -0,0 +1,98 @@
+"""Incrementally maintained portfolio statistics.
+
+``portfolio_stats`` holds one row per (metric, bucket), e.g. ("status",
+"completed") or ("value", "INR"). Rows are adjusted by deltas in the same
+transaction that changes a contract or an analysis (see the session
+listeners in app.py), so reading the whole dashboard is a scan of a few
+dozen rows however many contracts exist. ``rebuild_stats`` recomputes every
+row from the source tables, for the initial migration or after manual SQL
+edits.
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, Numeric, String, Table, select, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+stats_table = Table(
+    "portfolio_stats", MetaData(),
+    Column("metric", String(50), primary_key=True),
+    Column("bucket", String(50), primary_key=True),
+    # Exact like value_amount; FLOAT is single precision on MySQL
+    Column("value", Numeric(20, 2, asdecimal=False), nullable=False, default=0),
+)
+
+# ============ BUCKETS ============
+RISK_SCORE_BUCKETS = ["0-1", "2-3", "4-5", "6-7", "8-10"]
+
+def score_bucket(score) -> str:
+    if score is None:
+        return "unscored"
+    return RISK_SCORE_BUCKETS[min(max(int(score), 0) // 2, len(RISK_SCORE_BUCKETS) - 1)]
+
+def month_bucket(moment) -> str:
+    return (moment or datetime.utcnow()).strftime("%Y-%m")
+
+def contract_deltas(status: str, upload_date, sign: int = 1) -> Counter:
+    return Counter({("contracts", "total"): sign, ("status", status or "pending"): sign, ("uploads", month_bucket(upload_date)): sign})
+
+def analysis_deltas(risk_score, value_amount, value_currency, sign: int = 1) -> Counter:
+    deltas = Counter({("analyses", "total"): sign, ("risk_score", score_bucket(risk_score)): sign})
+    if value_amount is not None and value_currency:
+        deltas[("value", value_currency)] += sign * float(value_amount)
+        deltas[("valued", value_currency)] += sign
+    return deltas
+
+def status_change_deltas(old: str, new: str) -> Counter:
+    return Counter({("status", old): -1, ("status", new): 1})
+
+# ============ STORAGE ============
+def _upsert(conn, metric: str, bucket: str, delta: float):
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(stats_table).values(metric=metric, bucket=bucket, value=delta)
+        statement = statement.on_duplicate_key_update(value=stats_table.c.value + statement.inserted.value)
+    else:
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(stats_table).values(metric=metric, bucket=bucket, value=delta)
+        statement = statement.on_conflict_do_update(
+            index_elements=["metric", "bucket"],
+            set_={"value": stats_table.c.value + statement.excluded.value},
+        )
+    conn.execute(statement)
+
+def apply_deltas(conn, deltas: Counter):
+    # Sorted so concurrent writers lock rows in the same order
+    for (metric, bucket), delta in sorted(deltas.items()):
+        if delta:
+            _upsert(conn, metric, bucket, delta)
+
+def read_stats(conn) -> dict:
+    """Nested {metric: {bucket: value}} of every stored row"""
+    stats = {}
+    for metric, bucket, value in conn.execute(select(stats_table.c.metric, stats_table.c.bucket, stats_table.c.value)):
+        stats.setdefault(metric, {})[bucket] = value
+    return stats
+
+def rebuild_stats(conn):
+    """Recompute every statistic from contracts, analyses and risks"""
+    metadata = MetaData()
+    metadata.reflect(bind=conn, only=["contracts", "analysis_results", "analysis_risks"])
+    contracts = metadata.tables["contracts"]
+    results = metadata.tables["analysis_results"]
+    risks = metadata.tables["analysis_risks"]
+
+    deltas = Counter()
+    for status, upload_date in conn.execute(select(contracts.c.status, contracts.c.upload_date)):
+        deltas.update(contract_deltas(status, upload_date))
+    for risk_score, amount, currency in conn.execute(
+        select(results.c.risk_score, results.c.value_amount, results.c.value_currency)
+    ):
+        deltas.update(analysis_deltas(risk_score, amount, currency))
+    for severity, count in conn.execute(select(risks.c.severity, func.count()).group_by(risks.c.severity)):
+        deltas[("severity", severity)] += count
+
+    conn.execute(stats_table.delete())
+    apply_deltas(conn, deltas)
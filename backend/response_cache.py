@@ -0,0 +1,67 @@
+"""Conditional GET helpers and an in-process cache of serialized responses.
+
+Contract reads are versioned by a strong ETag computed from a cheap query
+(status and analyzed_at), so a client that already has the current version
+gets a bodiless 304 and the JSON is rebuilt only when something changed.
+Cached bodies are stored together with the ETag they were built for: an
+entry is only served while the version still matches, which keeps every
+API process correct even though each one invalidates only its own cache.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+# Completed analyses never change, so proxies and browsers may keep them
+COMPLETED_MAX_AGE = int(os.getenv("COMPLETED_MAX_AGE", "86400"))
+# Bump when the response shape changes so old ETags stop matching
+RESPONSE_VERSION = "1"
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("\0".join([RESPONSE_VERSION, *(str(p) for p in parts)]).encode("utf-8"))
+    return f'"{digest.hexdigest()[:24]}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header covers ``etag`` (weak comparison, as RFC 9110 asks)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+def cache_control(status: str) -> str:
+    if status == "completed":
+        return f"public, max-age={COMPLETED_MAX_AGE}"
+    # Still changing: clients may store it but must revalidate every time
+    return "no-cache"
+
+class ResponseCache:
+    """Thread-safe LRU of serialized bodies, one version per key"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, etag: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self.entries.move_to_end(key)
+                return entry[1]
+            return None
+
+    def put(self, key, etag: str, body: bytes):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
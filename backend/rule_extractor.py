@@ -0,0 +1,231 @@
+"""Deterministic extraction of parties, contract value and dates.
+
+Templated contracts state these fields in a few recognizable ways: "Client:"
+and "Contractor:" lines or a "between X (hereinafter the "Client") and Y
+(hereinafter the "Contractor")" block, a "Contract Value:" line, "Start
+Date:" and "Completion Date:" lines. Precompiled patterns find them in a few
+milliseconds on the CPU. Every match carries a confidence: labelled matches
+reach ``RULE_CONFIDENCE`` and can stand in for the LLM, weaker guesses (the
+largest amount in the document, an end date computed from a duration) only
+fill fields the LLM left empty or unparseable.
+"""
+import os
+import re
+from datetime import date, timedelta
+
+from chunked_analysis import is_specified
+from normalization import iter_amounts, parse_amount, parse_date
+
+RULE_CONFIDENCE = float(os.getenv("RULE_CONFIDENCE", "0.8"))
+RULE_FIELDS = ("parties", "contract_value", "start_date", "end_date")
+LABEL_WINDOW_CHARS = 150
+BETWEEN_BLOCK_CHARS = 1200
+
+# ============ PARTIES ============
+CLIENT_ROLES = ("client", "employer", "owner", "principal", "purchaser", "buyer")
+CONTRACTOR_ROLES = ("contractor", "sub-contractor", "subcontractor", "builder", "vendor", "supplier",
+                    "service provider")
+_ROLES = "|".join(re.escape(r) for r in sorted(CLIENT_ROLES + CONTRACTOR_ROLES, key=len, reverse=True))
+
+# "Client: ABC Ltd", "Name of the Contractor - XYZ Builders"
+_LABELLED_PARTY = re.compile(
+    rf"^[ \t]*(?:name\s+of\s+(?:the\s+)?)?(?P<role>{_ROLES})(?:'s)?(?:\s+name)?[ \t]*[:\-–][ \t]*(?P<name>\S[^\n]*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# (hereinafter referred to as the "Contractor", which expression shall ...)
+_HEREINAFTER = re.compile(
+    rf"\(?\s*hereinafter\s+(?:(?:called|referred\s+to\s+as|known\s+as)\s+)?(?:the\s+)?[\"“'‘]?(?P<role>{_ROLES})\b[^)]*\)?",
+    re.IGNORECASE,
+)
+_BETWEEN = re.compile(r"\bbetween\s+", re.IGNORECASE)
+_BLOCK_END = re.compile(r"\n[ \t]*\n|\bwhereas\b|\bnow\s+this\b", re.IGNORECASE)
+_AND = re.compile(r"\s+and\s+", re.IGNORECASE)
+_NAME_PREFIX = re.compile(r"^\s*(?:and\s+)?(?:m/s\.?\s*)?", re.IGNORECASE)
+# Where a party name stops: address, registration details, role markers, column gaps
+_NAME_END = re.compile(
+    r"[,;(\n]|\s+having\b|\s+a\s+(?:company|firm|partnership)\b|\s+registered\b|\s+incorporated\b"
+    r"|\s+represented\b|\s+situated\b|\s+with\s+(?:its|their)\b|\s{3,}",
+    re.IGNORECASE,
+)
+
+def _clean_name(raw: str):
+    raw = _NAME_PREFIX.sub("", raw)
+    cut = _NAME_END.search(raw)
+    name = " ".join((raw[:cut.start()] if cut else raw).split()).strip(" .:-\"'“”‘’")
+    if 2 <= len(name) <= 120 and is_specified(name):
+        return name
+    return None
+
+def _role_of(word: str) -> str:
+    return "client" if word.lower() in CLIENT_ROLES else "contractor"
+
+def _format_parties(client: str, contractor: str) -> str:
+    return f"Client: {client or '[Not clearly specified]'}, Contractor: {contractor or '[Not clearly specified]'}"
+
+def _labelled_parties(text: str) -> dict:
+    found = {}
+    for match in _LABELLED_PARTY.finditer(text):
+        role = _role_of(match.group("role"))
+        name = _clean_name(match.group("name"))
+        if name and role not in found:
+            found[role] = name
+    return found
+
+def _between_parties(text: str):
+    """({role: name}, roles_were_stated) from the first "between ... and ..." block"""
+    match = _BETWEEN.search(text)
+    if not match:
+        return {}, False
+    block = text[match.end():match.end() + BETWEEN_BLOCK_CHARS]
+    end = _BLOCK_END.search(block)
+    block = block[:end.start()] if end else block
+
+    found = {}
+    position = 0
+    for marker in _HEREINAFTER.finditer(block):
+        name = _clean_name(block[position:marker.start()])
+        role = _role_of(marker.group("role"))
+        if name and role not in found:
+            found[role] = name
+        position = marker.end()
+    if len(found) == 2:
+        return found, True
+
+    # No role markers: the first party is usually the client
+    parts = _AND.split(block, maxsplit=1)
+    if len(parts) == 2:
+        client, contractor = _clean_name(parts[0]), _clean_name(parts[1])
+        if client and contractor:
+            return {"client": client, "contractor": contractor}, False
+    return found, False
+
+# ============ CONTRACT VALUE ============
+_VALUE_LABEL = re.compile(
+    r"(?:contract|agreement|project|tender)\s+(?:value|price|sum|amount|cost)|total\s+(?:value|price|amount|cost)"
+    r"|lump[\s-]*sum|consideration\s+of",
+    re.IGNORECASE,
+)
+
+# ============ DATES ============
+_START_LABEL = re.compile(
+    r"(?:commencement|start(?:ing)?|effective)\s+date|date\s+of\s+(?:commencement|start)"
+    r"|commenc(?:e|ing)\s+(?:the\s+)?(?:works?\s+)?(?:on|from)|start(?:ing)?\s+(?:on|from)|with\s+effect\s+from",
+    re.IGNORECASE,
+)
+_END_LABEL = re.compile(
+    r"(?:completion|end(?:ing)?|expiry|expiration)\s+date|date\s+of\s+(?:completion|expiry)"
+    r"|completed?\s+(?:the\s+)?(?:works?\s+)?(?:by|on\s+or\s+before|before)|valid\s+(?:until|till|up\s*to)"
+    r"|end(?:ing|s)?\s+on|expir(?:es|ing)\s+on",
+    re.IGNORECASE,
+)
+_DURATION = re.compile(
+    r"(?:duration|period|term|within)\b[^\n\d]{0,40}?(?P<count>\d{1,3})\s*(?P<unit>months?|years?|weeks?|days?)\b",
+    re.IGNORECASE,
+)
+
+def _labelled_date(text: str, pattern):
+    """First date on the same line as a label, or None"""
+    for match in pattern.finditer(text):
+        line = text[match.end():match.end() + LABEL_WINDOW_CHARS].split("\n", 1)[0]
+        found = parse_date(line)
+        if found:
+            return found
+    return None
+
+def _add_duration(start: date, count: int, unit: str) -> date:
+    """Last day of a term of ``count`` units beginning on ``start``"""
+    unit = unit.lower().rstrip("s")
+    if unit in ("month", "year"):
+        months = start.month - 1 + count * (12 if unit == "year" else 1)
+        year, month = start.year + months // 12, months % 12 + 1
+        day = start.day
+        while True:
+            try:
+                end = date(year, month, day)
+                break
+            except ValueError:
+                day -= 1
+    else:
+        end = start + timedelta(days=count * (7 if unit == "week" else 1))
+    return end - timedelta(days=1)
+
+# ============ EXTRACTION ============
+class RuleExtraction:
+    """Rule matches for RULE_FIELDS, each with a confidence between 0 and 1"""
+
+    def __init__(self):
+        self.values = {}
+        self.confidence = {}
+
+    def add(self, field: str, value, confidence: float):
+        if value and confidence > self.confidence.get(field, 0.0):
+            self.values[field] = value
+            self.confidence[field] = confidence
+
+    def confident(self) -> dict:
+        return {f: v for f, v in self.values.items() if self.confidence[f] >= RULE_CONFIDENCE}
+
+    @property
+    def complete(self) -> bool:
+        """Whether every field is confident enough to skip asking the LLM for it"""
+        return all(f in self.confident() for f in RULE_FIELDS)
+
+def extract_fields(text: str) -> RuleExtraction:
+    """Parties, contract value and term dates of a contract text"""
+    extraction = RuleExtraction()
+    if not text:
+        return extraction
+
+    labelled = _labelled_parties(text)
+    between, roles_stated = _between_parties(text)
+    for parties, confidence in ((labelled, 0.9), (between, 0.95 if roles_stated else 0.6)):
+        if len(parties) == 2:
+            extraction.add("parties", _format_parties(parties["client"], parties["contractor"]), confidence)
+        elif parties:
+            extraction.add("parties", _format_parties(parties.get("client"), parties.get("contractor")), 0.4)
+
+    for label in _VALUE_LABEL.finditer(text):
+        window = text[label.end():label.end() + LABEL_WINDOW_CHARS]
+        amount = next(iter_amounts(window), None)
+        if amount:
+            extraction.add("contract_value", amount[2].group(0).strip(), 0.9 if amount[1] else 0.7)
+            break
+    if "contract_value" not in extraction.values:
+        # Unlabelled: the headline value is usually the largest amount mentioned
+        amounts = [a for a in iter_amounts(text) if a[1]]
+        if amounts:
+            extraction.add("contract_value", max(amounts, key=lambda a: a[0])[2].group(0).strip(), 0.5)
+
+    start = _labelled_date(text, _START_LABEL)
+    end = _labelled_date(text, _END_LABEL)
+    if start:
+        extraction.add("start_date", start.isoformat(), 0.9)
+    if end and (not start or end > start):
+        extraction.add("end_date", end.isoformat(), 0.9)
+    elif start:
+        duration = _DURATION.search(text)
+        if duration:
+            end = _add_duration(start, int(duration.group("count")), duration.group("unit"))
+            extraction.add("end_date", end.isoformat(), 0.6)
+    return extraction
+
+def _usable(field: str, value) -> bool:
+    if not is_specified(value):
+        return False
+    if field == "contract_value":
+        return parse_amount(value)[0] is not None
+    if field in ("start_date", "end_date"):
+        return parse_date(value) is not None
+    return True
+
+def apply_extraction(analysis: dict, extraction: RuleExtraction) -> dict:
+    """Fill and sanity-check an analysis with rule matches.
+
+    Confident matches replace the LLM's value; weaker ones only replace a
+    value that is missing, a placeholder or cannot be parsed.
+    """
+    result = dict(analysis)
+    for field, value in extraction.values.items():
+        if extraction.confidence[field] >= RULE_CONFIDENCE or not _usable(field, result.get(field)):
+            result[field] = value
+    return result
@@ -0,0 +1,108 @@
+"""Response models of the public API.
+
+Declaring them documents every endpoint in /docs and lets pydantic-core
+serialize datetimes and nested objects directly, instead of hand-built
+dicts with ``isoformat()`` calls. ORM rows are accepted as input
+(``from_attributes``).
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+class APIModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+# ============ CONTRACTS ============
+class ContractSummary(APIModel):
+    id: int
+    filename: str
+    upload_date: datetime
+    status: str
+
+class ContractList(APIModel):
+    items: List[ContractSummary]
+    next_cursor: Optional[str] = None
+    limit: int
+
+class Analysis(APIModel):
+    parties: Optional[str] = None
+    contract_value: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    key_terms: list = Field(default_factory=list, description="Key terms as returned by the model")
+    risks: list = Field(default_factory=list, description='[{"description": ..., "severity": "low|medium|high"}]')
+    risk_score: Optional[float] = None
+    value_amount: Optional[float] = None
+    value_currency: Optional[str] = None
+    start_on: Optional[date] = None
+    end_on: Optional[date] = None
+    analyzed_at: Optional[datetime] = None
+
+class ContractDetail(APIModel):
+    contract: ContractSummary
+    analysis: Optional[Analysis] = None
+
+class ContractDetailsPage(APIModel):
+    items: List[ContractDetail]
+    missing: List[int] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+    limit: Optional[int] = None
+
+class SimilarContract(ContractSummary):
+    similarity: float = Field(description="Estimated Jaccard similarity of the contract texts' 5-word shingles")
+
+class SimilarContracts(APIModel):
+    contract_id: int
+    items: List[SimilarContract]
+
+# ============ JOBS ============
+class JobStatus(APIModel):
+    job_id: int
+    contract_id: int
+    status: str
+    stage: Optional[str] = Field(None, description="stored, extracting, prompting, parsing, saved or failed")
+    detail: Optional[str] = Field(None, description='e.g. "page 3 of 12"')
+    attempts: Optional[int] = None
+    leased_by: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchUploadResult(APIModel):
+    """One line of the POST /upload/batch stream"""
+    filename: str
+    job_id: Optional[int] = None
+    contract_id: Optional[int] = None
+    status: str = Field(description="completed, failed, or rejected when the file could not be stored")
+    error: Optional[str] = None
+
+class BatchUploadPending(APIModel):
+    """Last line of the POST /upload/batch stream when it stops waiting for analyses"""
+    status: str = "pending"
+    pending_job_ids: List[int] = Field(description="Still analyzing; follow them with GET /jobs/{job_id}")
+
+# ============ SEARCH & STATS ============
+class SearchHit(APIModel):
+    id: int
+    filename: str
+    upload_date: datetime
+    status: str
+    score: Optional[float] = None
+    snippet: str
+
+class SearchResults(APIModel):
+    items: List[SearchHit]
+    next_offset: Optional[int] = None
+    limit: int
+
+class CurrencyTotal(APIModel):
+    total: float
+    contracts: int
+
+class PortfolioStats(APIModel):
+    total_contracts: int
+    analyzed_contracts: int
+    by_status: Dict[str, int]
+    risk_severity: Dict[str, int]
+    risk_score_buckets: Dict[str, int]
+    value_by_currency: Dict[str, CurrencyTotal]
+    monthly_uploads: Dict[str, int]
@@ -0,0 +1,73 @@
+"""Query helpers for contract full-text search.
+
+On SQLite the ``contract_search`` FTS5 table (see migrations.py) indexes the
+filename, parties, key terms, risk descriptions and extracted text of every
+analyzed contract, and is kept current by triggers on ``analysis_results``
+and ``contract_texts``. Search then ranks with bm25 and highlights matches
+with FTS5's ``snippet``. Its porter stemmer would also stem "pay*" into
+"pai*", so prefix terms are matched against ``contract_search_prefix``, an
+unstemmed copy kept current by its own triggers. Other databases fall back
+to LIKE matching, with the snippet built here.
+"""
+import re
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_CHARS = 160
+
+# bm25 weights for (filename, parties, key_terms, risks, body)
+COLUMN_WEIGHTS = (5.0, 4.0, 2.0, 2.0, 1.0)
+
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+def parse_terms(q: str) -> list:
+    """Words and "quoted phrases" of a search box query"""
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(q):
+        term = (phrase or word).strip()
+        if term and term != "*":
+            terms.append(term)
+    return terms
+
+def split_prefix_terms(terms: list) -> tuple:
+    """(words and phrases, "word*" prefix terms)"""
+    return [t for t in terms if not t.endswith("*")], [t for t in terms if t.endswith("*")]
+
+def fts_query(terms: list) -> str:
+    """FTS5 MATCH expression requiring every term; "word*" searches a prefix.
+
+    Terms are quoted, so user input can never be parsed as FTS5 syntax.
+    """
+    parts = []
+    for term in terms:
+        prefix = term.endswith("*")
+        quoted = '"' + term.rstrip("*").replace('"', '""') + '"'
+        parts.append(quoted + "*" if prefix else quoted)
+    return " ".join(parts)
+
+def like_pattern(term: str) -> str:
+    escaped = term.rstrip("*").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def make_snippet(texts: list, terms: list, size: int = SNIPPET_CHARS) -> str:
+    """Window around the first match in the first of ``texts`` that has one, matches highlighted"""
+    texts = [t for t in texts if t]
+    if not texts:
+        return ""
+    words = [re.escape(t.rstrip("*")) for t in terms if t.rstrip("*")]
+    pattern = re.compile("|".join(words), re.IGNORECASE) if words else None
+
+    text, first = texts[0], None
+    for candidate in texts:
+        first = pattern.search(candidate) if pattern else None
+        if first:
+            text = candidate
+            break
+
+    start = max(0, first.start() - size // 2) if first else 0
+    window = " ".join(text[start:start + size].split())
+    if pattern:
+        window = pattern.sub(lambda m: HIGHLIGHT_START + m.group(0) + HIGHLIGHT_END, window)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + size < len(text) else ""
+    return prefix + window + suffix
@@ -0,0 +1,368 @@
+"""Streaming upload ingestion and content-addressed file storage.
+
+Multipart bodies are parsed straight from the request stream and every file
+part is written to disk chunk by chunk, so memory per upload stays constant
+whatever the file size. While the bytes are copied the size limit is
+enforced, the SHA-256 is computed and the PDF magic bytes are checked. The
+finished file is stored under its hash, so identical uploads share one file
+and different uploads with the same name can never overwrite each other.
+
+Batch uploads may also contain zip archives, which are spooled to disk and
+unpacked member by member, and report invalid files individually instead of
+failing the whole request. Members beyond the file limit or the unpacked size
+limit are rejected before anything is written.
+"""
+import hashlib
+import os
+import uuid
+import zipfile
+
+from fastapi import HTTPException
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+# ============ CONFIG ============
+UPLOAD_DIR = "./uploads"
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+MAX_ARCHIVE_MB = int(os.getenv("MAX_ARCHIVE_MB", "500"))
+MAX_ARCHIVE_BYTES = MAX_ARCHIVE_MB * 1024 * 1024
+# Zip archives compress well, so what they unpack to is capped separately
+MAX_UNPACKED_MB = int(os.getenv("MAX_UNPACKED_MB", "2000"))
+MAX_UNPACKED_BYTES = MAX_UNPACKED_MB * 1024 * 1024
+
+# Request body schema for /docs, since uploads are parsed by hand
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "PDF files and/or zip archives of PDFs",
+                        }
+                    },
+                }
+            }
+        },
+    }
+}
+
+# ============ STORAGE ============
+class StoredUpload:
+    """A file persisted in the content-addressed store"""
+
+    def __init__(self, filename: str, path: str, content_hash: str, size: int, created: bool = False):
+        self.filename = filename
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        # False when an identical file was already stored
+        self.created = created
+
+class RejectedUpload:
+    """A file of a batch upload that could not be stored"""
+
+    def __init__(self, filename: str, error: str):
+        self.filename = filename
+        self.error = error
+
+def content_path(content_hash: str) -> str:
+    return f"{UPLOAD_DIR}/{content_hash[:2]}/{content_hash}.pdf"
+
+class ContentAddressedWriter:
+    """Streams one PDF to a temporary file, then moves it to its hash path"""
+
+    def __init__(self, filename: str, max_bytes: int = MAX_UPLOAD_BYTES):
+        if not filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="Only PDF files allowed")
+        os.makedirs(f"{UPLOAD_DIR}/tmp", exist_ok=True)
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.temp_path = f"{UPLOAD_DIR}/tmp/{uuid.uuid4().hex}.part"
+        self.file = open(self.temp_path, "wb")
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.abort()
+            raise HTTPException(status_code=413, detail=f"File exceeds maximum size of {MAX_UPLOAD_MB}MB")
+        if len(self.head) < len(PDF_MAGIC):
+            self.head += data[:len(PDF_MAGIC) - len(self.head)]
+            if not PDF_MAGIC.startswith(self.head):
+                self.abort()
+                raise HTTPException(status_code=400, detail=f"{self.filename} is not a valid PDF file")
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def finish(self) -> StoredUpload:
+        self.file.close()
+        if self.head != PDF_MAGIC:
+            self.abort()
+            raise HTTPException(status_code=400, detail=f"{self.filename} is not a valid PDF file")
+
+        content_hash = self.hasher.hexdigest()
+        path = content_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        created = not os.path.exists(path)
+        if created:
+            os.replace(self.temp_path, path)
+        else:
+            os.remove(self.temp_path)
+        return StoredUpload(self.filename, path, content_hash, self.size, created)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+def store_file(filename: str, stream, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Copy a file-like object into the store in fixed-size chunks"""
+    writer = ContentAddressedWriter(filename, max_bytes)
+    try:
+        while chunk := stream.read(CHUNK_SIZE):
+            writer.write(chunk)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.finish()
+
+class ArchiveWriter:
+    """Spools a zip archive to disk, then stores each PDF inside it"""
+
+    def __init__(self, filename: str, max_bytes: int = MAX_UPLOAD_BYTES):
+        os.makedirs(f"{UPLOAD_DIR}/tmp", exist_ok=True)
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.temp_path = f"{UPLOAD_DIR}/tmp/{uuid.uuid4().hex}.zip"
+        self.file = open(self.temp_path, "wb")
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > MAX_ARCHIVE_BYTES:
+            self.abort()
+            raise HTTPException(status_code=413, detail=f"Archive exceeds maximum size of {MAX_ARCHIVE_MB}MB")
+        self.file.write(data)
+
+    def finish(self, max_files: int, too_many: str) -> list:
+        """StoredUpload or RejectedUpload for every PDF member, in archive order.
+
+        Members past ``max_files`` or past MAX_UNPACKED_BYTES in total are
+        rejected without being stored.
+        """
+        self.file.close()
+        results = []
+        stored = 0
+        unpacked = 0
+        try:
+            with zipfile.ZipFile(self.temp_path) as archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not name.lower().endswith(".pdf"):
+                        continue
+                    if stored >= max_files:
+                        results.append(RejectedUpload(name, too_many))
+                        continue
+                    if unpacked + member.file_size > MAX_UNPACKED_BYTES:
+                        results.append(RejectedUpload(name, f"Archive unpacks to more than {MAX_UNPACKED_MB}MB"))
+                        continue
+                    try:
+                        # The declared size may lie, so the copy is capped as well
+                        with archive.open(member) as stream:
+                            upload = store_file(name, stream, min(self.max_bytes, MAX_UNPACKED_BYTES - unpacked))
+                        results.append(upload)
+                        stored += 1
+                        unpacked += upload.size
+                    except HTTPException as e:
+                        results.append(RejectedUpload(name, e.detail))
+                    except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                        # Corrupt, encrypted or unsupported member
+                        results.append(RejectedUpload(name, str(e)))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{self.filename} is not a valid zip archive")
+        finally:
+            self.abort()
+        return results
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+# ============ MULTIPART STREAMING ============
+class _UploadParser:
+    """python-multipart callbacks that route file parts into writers.
+
+    With ``batch`` set, zip archives are unpacked and a file that cannot be
+    stored becomes a RejectedUpload instead of failing the request.
+    """
+
+    def __init__(self, max_files: int, max_bytes: int, batch: bool = False):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.batch = batch
+        self.filename = None
+        self.files_seen = 0
+        self.header_name = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.writer = None
+        self.finished = []
+        self.stored = []
+
+    def on_part_begin(self):
+        self.disposition = b""
+        self.writer = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_name.lower() == b"content-disposition":
+            self.disposition = self.header_value
+        self.header_name = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        if b"filename" not in options:
+            return  # plain form fields are ignored
+        self.filename = os.path.basename(options[b"filename"].decode("utf-8", errors="replace"))
+        if self.batch and self.filename.lower().endswith(".zip"):
+            self.writer = ArchiveWriter(self.filename, self.max_bytes)
+            return
+        self._guard(self._open_file)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.writer:
+            self._guard(self.writer.write, data[start:end])
+
+    def on_part_end(self):
+        if not self.writer:
+            return
+        writer, self.writer = self.writer, None
+        if isinstance(writer, ArchiveWriter):
+            # Archive members count against max_files one by one
+            result = self._guard(writer.finish, self.max_files - self.files_seen, self._too_many())
+            for member in result or []:
+                if isinstance(member, StoredUpload):
+                    self.files_seen += 1
+                    self.stored.append(member)
+                self.finished.append(member)
+            return
+        result = self._guard(writer.finish)
+        if result is not None:
+            self.stored.append(result)
+            self.finished.append(result)
+
+    def _open_file(self):
+        self.files_seen += 1
+        if self.files_seen > self.max_files:
+            raise HTTPException(status_code=400, detail=self._too_many())
+        self.writer = ContentAddressedWriter(self.filename, self.max_bytes)
+
+    def _too_many(self) -> str:
+        return f"Too many files. Maximum number of files is {self.max_files}"
+
+    def _guard(self, step, *args):
+        """Run a writer step; in batch mode a failure only rejects the current file"""
+        try:
+            return step(*args)
+        except HTTPException as e:
+            if not self.batch:
+                raise
+            if self.writer:
+                self.writer.abort()
+                self.writer = None
+            self.finished.append(RejectedUpload(self.filename, e.detail))
+
+    def abort(self):
+        if self.writer:
+            self.writer.abort()
+            self.writer = None
+
+    def take(self) -> list:
+        """Hand the finished uploads over to the caller"""
+        finished, self.finished = self.finished, []
+        if self.batch:
+            # Batch callers register every file as it arrives, so it is theirs now
+            self.stored = [upload for upload in self.stored if upload not in finished]
+        return finished
+
+    def discard_stored(self):
+        """Remove the files this request added to the store and did not hand over"""
+        for upload in self.stored:
+            if upload.created and os.path.exists(upload.path):
+                os.remove(upload.path)
+
+async def stream_uploads(request, max_files: int = 1, max_bytes: int = MAX_UPLOAD_BYTES, batch: bool = False):
+    """Parse a multipart request body, yielding each file once it is stored.
+
+    Batch mode also yields a RejectedUpload for every file it could not store.
+    A failed request leaves no files behind, except those batch mode already
+    yielded (the caller has registered them).
+    """
+    content_length = request.headers.get("content-length")
+    max_body = max_files * max_bytes + (MAX_ARCHIVE_BYTES if batch else 0) + CHUNK_SIZE
+    if content_length and int(content_length) > max_body:
+        raise HTTPException(status_code=413, detail=f"File exceeds maximum size of {MAX_UPLOAD_MB}MB")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    handler = _UploadParser(max_files, max_bytes, batch)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": handler.on_part_begin,
+        "on_part_data": handler.on_part_data,
+        "on_part_end": handler.on_part_end,
+        "on_header_field": handler.on_header_field,
+        "on_header_value": handler.on_header_value,
+        "on_header_end": handler.on_header_end,
+        "on_headers_finished": handler.on_headers_finished,
+    })
+
+    try:
+        async for chunk in request.stream():
+            # Callbacks write to disk, so feed the parser off the event loop
+            await run_in_threadpool(parser.write, chunk)
+            for upload in handler.take():
+                yield upload
+        # finalize() may still complete the last part
+        await run_in_threadpool(parser.finalize)
+        for upload in handler.take():
+            yield upload
+    except Exception:
+        handler.discard_stored()
+        raise
+    finally:
+        handler.abort()
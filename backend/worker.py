@@ -0,0 +1,30 @@
+"""Standalone analysis worker.
+
+Run one or more of these next to the API (`python -m worker`) to scale
+analysis throughput. Workers coordinate through lease tokens on the
+analysis_jobs table, so they can run on any host sharing the database.
+"""
+import os
+import signal
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+
+def main():
+    # Imported here, not at module level: the PDF extraction pool spawns
+    # children that re-import __main__, and they must not build another app
+    from app import WorkerPool, WORKER_ID
+
+    pool = WorkerPool(WORKER_CONCURRENCY, worker_id=WORKER_ID)
+
+    def shutdown(signum, frame):
+        print(f"🛑 Worker {WORKER_ID} stopping, active jobs will finish first")
+        pool.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    pool.start()
+    pool.join()
+
+if __name__ == "__main__":
+    main()
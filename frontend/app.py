@@ -2,9 +2,9 @@ import os
 import streamlit as st
 import requests
 import json
+import html
 from datetime import datetime
 import pandas as pd
-import time
 
 # ============ PAGE CONFIGURATION ============
 st.set_page_config(
@@ -194,6 +194,52 @@ st.markdown("""
 
 # ============ CONFIG ============
 API_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+ETAG_CACHE_SIZE = 50
+
+def get_json(path, params=None):
+    """GET an API resource, revalidating the last copy with If-None-Match.
+
+    Streamlit reruns the script on every interaction; unchanged data then
+    costs the backend one cheap version query and comes back as a 304.
+    Returns (status_code, body).
+    """
+    cache = st.session_state.setdefault("etag_cache", {})
+    key = path + "?" + json.dumps(params or {}, sort_keys=True)
+    cached = cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(f"{API_URL}{path}", params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+    body = response.json()
+    if response.status_code == 200 and response.headers.get("ETag"):
+        cache.pop(key, None)
+        cache[key] = (response.headers["ETag"], body)
+        while len(cache) > ETAG_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+    return response.status_code, body
+
+# Progress bar position and label of each analysis stage
+STAGE_PROGRESS = {
+    "stored": (10, "Document stored, waiting for an analysis worker"),
+    "extracting": (30, "Extracting contract text from PDF"),
+    "prompting": (60, "Analyzing contract terms and conditions"),
+    "parsing": (85, "Identifying potential risks and compliance issues"),
+    "saved": (100, "Analysis complete. Preparing results"),
+}
+
+def follow_progress(contract_id, on_event):
+    """Read the contract's server-sent progress events until the analysis ends.
+
+    Calls on_event with every update and returns the last one.
+    """
+    job = None
+    url = f"{API_URL}/contracts/{contract_id}/events"
+    with requests.get(url, stream=True, timeout=(10, 300)) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("data:"):
+                job = json.loads(line[5:])
+                on_event(job)
+    return job
 
 # ============ HEADER ============
 st.markdown("""
@@ -248,50 +294,89 @@ if page == "Upload & Analyze":
         </div>
         """, unsafe_allow_html=True)
         
-        uploaded_file = st.file_uploader(
-            "Choose PDF File",
-            type=['pdf'],
-            help="Maximum file size: 50MB"
+        uploaded_files = st.file_uploader(
+            "Choose PDF Files",
+            type=['pdf', 'zip'],
+            accept_multiple_files=True,
+            help="Maximum file size: 50MB per PDF. Select several PDFs or a zip archive for batch analysis"
         )
         
+        # A single PDF gets the detailed view, anything more goes through the batch endpoint
+        is_batch = len(uploaded_files) > 1 or any(f.name.lower().endswith('.zip') for f in uploaded_files)
+        uploaded_file = uploaded_files[0] if uploaded_files and not is_batch else None
+        
+        if is_batch:
+            st.success(f"Files Loaded: **{len(uploaded_files)}**")
+            
+            if st.button("START BATCH ANALYSIS", use_container_width=True):
+                status_text = st.empty()
+                results_table = st.empty()
+                results = []
+                status_text.text("Uploading documents to server...")
+                
+                try:
+                    files = [
+                        ("files", (f.name, f, "application/zip" if f.name.lower().endswith('.zip') else "application/pdf"))
+                        for f in uploaded_files
+                    ]
+                    # One NDJSON line arrives per file as soon as its analysis ends
+                    with requests.post(f"{API_URL}/upload/batch", files=files, stream=True, timeout=(10, 600)) as response:
+                        if response.status_code != 200:
+                            st.error(f"Batch Upload Failed: {response.json().get('detail', 'Unknown error')}")
+                        else:
+                            for line in response.iter_lines(decode_unicode=True):
+                                if not line:
+                                    continue
+                                result = json.loads(line)
+                                if 'pending_job_ids' in result:
+                                    st.info(f"Still analyzing {len(result['pending_job_ids'])} files, check the Contract Dashboard later")
+                                    continue
+                                results.append(result)
+                                status_text.text(f"{len(results)} files finished...")
+                                results_table.dataframe(
+                                    pd.DataFrame(results, columns=['filename', 'status', 'contract_id', 'error']),
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+                    
+                    if results:
+                        completed = sum(1 for r in results if r['status'] == 'completed')
+                        st.success(f"Batch Completed: {completed} of {len(results)} files analyzed")
+                
+                except Exception as e:
+                    st.error(f"Connection Error: {str(e)}")
+                    st.info("Please ensure the backend server is running on port 8000")
+        
         if uploaded_file:
             st.success(f"File Loaded: **{uploaded_file.name}**")
             st.info(f"File Size: {uploaded_file.size / 1024:.2f} KB")
             
             if st.button("START ANALYSIS", use_container_width=True):
                 with st.spinner(""):
-                    # Progress bar
+                    # Progress bar, driven by the backend's stage events
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
+                    def show_progress(job):
+                        percent, label = STAGE_PROGRESS.get(job.get('stage'), (0, "Waiting for analysis"))
+                        if job.get('detail'):
+                            label = f"{label} ({job['detail']})"
+                        status_text.text(f"{label}...")
+                        progress_bar.progress(percent)
+                    
                     status_text.text("Uploading document to server...")
-                    progress_bar.progress(20)
-                    time.sleep(0.5)
                     
                     try:
                         files = {"file": (uploaded_file.name, uploaded_file, "application/pdf")}
-                        
-                        status_text.text("Extracting contract text from PDF...")
-                        progress_bar.progress(40)
-                        time.sleep(0.5)
-                        
                         response = requests.post(f"{API_URL}/upload", files=files)
                         
-                        status_text.text("Analyzing contract terms and conditions...")
-                        progress_bar.progress(60)
-                        time.sleep(1)
-                        
-                        if response.status_code == 200:
+                        job = None
+                        if response.status_code in (200, 202):
                             result = response.json()
-                            
-                            status_text.text("Identifying potential risks and compliance issues...")
-                            progress_bar.progress(80)
-                            time.sleep(0.5)
-                            
-                            status_text.text("Analysis complete. Preparing results...")
-                            progress_bar.progress(100)
-                            time.sleep(0.5)
-                            
+                            show_progress(result)
+                            job = follow_progress(result['contract_id'], show_progress)
+                        
+                        if job and job['status'] == 'completed':
                             st.success("Analysis Completed Successfully")
                             
                             # Fetch analysis
@@ -359,6 +444,16 @@ if page == "Upload & Analyze":
                                             {risk['description']}
                                         </div>
                                         """, unsafe_allow_html=True)
+
+                                    # Other revisions of the same contract
+                                    similar_response = requests.get(f"{API_URL}/contracts/{result['contract_id']}/similar")
+                                    if similar_response.status_code == 200 and similar_response.json()['items']:
+                                        st.markdown('<p class="section-header">Similar Contracts</p>', unsafe_allow_html=True)
+                                        for item in similar_response.json()['items']:
+                                            st.markdown(f"**{item['filename']}** (ID {item['id']}, uploaded {item['upload_date'][:10]}) - "
+                                                        f"{item['similarity']:.0%} similar")
+                        elif job:
+                            st.error(f"Analysis Failed: {job.get('error') or 'Unknown error'}")
                         else:
                             st.error(f"Analysis Failed: {response.json().get('detail', 'Unknown error')}")
                     
@@ -394,27 +489,82 @@ if page == "Upload & Analyze":
 
 # ============ PAGE 2: DASHBOARD ============
 elif page == "Contract Dashboard":
+    # Full-text search across contract text, parties, key terms and risks
+    st.markdown('<p class="section-header">Search Contracts</p>', unsafe_allow_html=True)
+    search_query = st.text_input("Search", placeholder='e.g. "liquidated damages" or XYZ Builders')
+    if search_query:
+        try:
+            search_response = requests.get(f"{API_URL}/search", params={"q": search_query, "limit": 20})
+            if search_response.status_code == 200:
+                hits = search_response.json()['items']
+                if not hits:
+                    st.info("No contracts match your search")
+                # Contract text is untrusted: escape it, then restore the highlight tags
+                highlighted = lambda text: html.escape(text).replace("&lt;mark&gt;", "<mark>").replace("&lt;/mark&gt;", "</mark>")
+                for hit in hits:
+                    st.markdown(
+                        f"**#{hit['id']}** {highlighted(hit['filename'])} · {hit['status']}<br>{highlighted(hit['snippet'])}",
+                        unsafe_allow_html=True
+                    )
+            else:
+                st.error(f"Search failed: {search_response.json().get('detail', 'Unknown error')}")
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+        st.markdown("---")
+    
     st.markdown('<p class="section-header">All Analyzed Contracts</p>', unsafe_allow_html=True)
     
+    # Filters are applied server-side; pages are fetched one at a time
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        status_filter = st.selectbox("Status", ["All", "completed", "analyzing", "pending", "failed"])
+    with col2:
+        filename_filter = st.text_input("Filename starts with")
+    with col3:
+        page_size = st.selectbox("Contracts per page", [25, 50, 100, 200], index=1)
+    
+    params = {"limit": page_size}
+    if status_filter != "All":
+        params["status"] = status_filter
+    if filename_filter:
+        params["filename_prefix"] = filename_filter
+    
+    # Reset to the first page whenever the filters change
+    filter_key = json.dumps(params, sort_keys=True)
+    if st.session_state.get("contract_filter_key") != filter_key:
+        st.session_state.contract_filter_key = filter_key
+        st.session_state.contract_cursors = [None]
+    if st.session_state.contract_cursors[-1]:
+        params["cursor"] = st.session_state.contract_cursors[-1]
+    
     try:
-        response = requests.get(f"{API_URL}/contracts")
-        if response.status_code == 200:
-            contracts = response.json()
+        # One request returns the page of contracts together with their analyses
+        status_code, contract_page = get_json("/contracts/details", params)
+        if status_code == 200:
+            details = {item['contract']['id']: item for item in contract_page['items']}
+            contracts = [
+                {**item['contract'], 'risk_score': item['analysis']['risk_score'] if item['analysis'] else None}
+                for item in contract_page['items']
+            ]
             
             if contracts:
-                # Summary metrics
+                # Portfolio metrics come pre-aggregated from /stats
+                stats_response = requests.get(f"{API_URL}/stats")
+                stats = stats_response.json() if stats_response.status_code == 200 else {}
+                total = stats.get('total_contracts', 0)
+                completed = stats.get('by_status', {}).get('completed', 0)
+                
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
                     st.markdown(f"""
                     <div class="metric-card">
                         <div class="metric-label">Total Contracts</div>
-                        <div class="metric-value">{len(contracts)}</div>
+                        <div class="metric-value">{total}</div>
                     </div>
                     """, unsafe_allow_html=True)
                 
                 with col2:
-                    completed = sum(1 for c in contracts if c['status'] == 'completed')
                     st.markdown(f"""
                     <div class="metric-card" style="background: linear-gradient(135deg, #2f9e44 0%, #2b8a3e 100%);">
                         <div class="metric-label">Completed</div>
@@ -423,21 +573,31 @@ elif page == "Contract Dashboard":
                     """, unsafe_allow_html=True)
                 
                 with col3:
-                    pending = sum(1 for c in contracts if c['status'] != 'completed')
                     st.markdown(f"""
                     <div class="metric-card" style="background: linear-gradient(135deg, #e67700 0%, #cc6600 100%);">
                         <div class="metric-label">Pending</div>
-                        <div class="metric-value">{pending}</div>
+                        <div class="metric-value">{total - completed}</div>
                     </div>
                     """, unsafe_allow_html=True)
                 
+                if stats:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("**Risk Severity Distribution**")
+                        st.bar_chart(pd.Series(stats['risk_severity'], name="Risks"))
+                    with col2:
+                        st.markdown("**Monthly Uploads**")
+                        st.bar_chart(pd.Series(stats['monthly_uploads'], name="Uploads"))
+                    for currency, value in stats['value_by_currency'].items():
+                        st.caption(f"Total {currency} contract value: {value['total']:,.0f} across {value['contracts']} contracts")
+                
                 st.markdown("---")
                 
                 # Contracts table
                 st.markdown('<p class="section-header">Contract Records</p>', unsafe_allow_html=True)
                 df = pd.DataFrame(contracts)
                 df['upload_date'] = pd.to_datetime(df['upload_date']).dt.strftime('%Y-%m-%d %H:%M')
-                df.columns = ['ID', 'Filename', 'Upload Date', 'Status']
+                df.columns = ['ID', 'Filename', 'Upload Date', 'Status', 'Risk Score']
                 
                 st.dataframe(
                     df, 
@@ -445,6 +605,18 @@ elif page == "Contract Dashboard":
                     hide_index=True
                 )
                 
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    if len(st.session_state.contract_cursors) > 1 and st.button("PREVIOUS PAGE"):
+                        st.session_state.contract_cursors.pop()
+                        st.rerun()
+                with col2:
+                    st.caption(f"Page {len(st.session_state.contract_cursors)}")
+                with col3:
+                    if contract_page['next_cursor'] and st.button("NEXT PAGE"):
+                        st.session_state.contract_cursors.append(contract_page['next_cursor'])
+                        st.rerun()
+                
                 # View details
                 st.markdown('<p class="section-header">View Contract Details</p>', unsafe_allow_html=True)
                 selected_id = st.selectbox(
@@ -454,11 +626,10 @@ elif page == "Contract Dashboard":
                 )
                 
                 if st.button("VIEW FULL ANALYSIS", use_container_width=True):
-                    detail_response = requests.get(f"{API_URL}/contracts/{selected_id}")
+                    # Already loaded with the page, no extra request
+                    data = details.get(selected_id)
                     
-                    if detail_response.status_code == 200:
-                        data = detail_response.json()
-                        
+                    if data:
                         st.markdown(f"### Contract: {data['contract']['filename']}")
                         
                         if data['analysis']:
@@ -502,6 +673,8 @@ elif page == "Contract Dashboard":
                                     """, unsafe_allow_html=True)
                         else:
                             st.warning("Analysis pending or incomplete")
+            elif status_filter != "All" or filename_filter:
+                st.info("No contracts match the selected filters.")
             else:
                 st.info("No contracts uploaded yet. Navigate to 'Upload & Analyze' to begin.")
         else: